@@ -1,3 +1,4 @@
+import argparse
 import os
 import django
 from pprint import pprint
@@ -8,7 +9,11 @@ django.setup()
 from catalog.graph_analysis import export_graph_analysis_to_json
 
 def main():
-    path, data = export_graph_analysis_to_json()
+    parser = argparse.ArgumentParser(description="Analyze the category similarity graph.")
+    parser.add_argument("--workers", type=int, default=1, help="Processes computing island diameters in parallel.")
+    args = parser.parse_args()
+
+    path, data = export_graph_analysis_to_json(workers=args.workers)
     print(f"\n✅ Graph analysis saved to: {path}\n")
     pprint(data)
 
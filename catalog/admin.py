@@ -1,16 +1,20 @@
 import nested_admin
 from django.contrib import admin
-from django.db import models
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import redirect
 from django.template.response import TemplateResponse
 from django.urls import path
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.utils.html import format_html
 from django.views.decorators.http import require_POST
 
-from catalog.graph_analysis import export_graph_analysis_to_json
-from .models import Category, SimilarCategory
+from catalog.graph_analysis import graph_revision
+from catalog.jobs import latest_graph_report, request_graph_report, thumbnail_metrics
+from catalog.ordering import move_category
+from catalog.similarity import SimilarityIndex
+from catalog.uploads import upload_metrics
+from .models import Category, GraphReport, SimilarCategory
 
 
 @admin.register(Category)
@@ -52,22 +56,11 @@ class CategoryAdmin(nested_admin.NestedModelAdmin):
         if not obj.id:
             return "Save the category to view similar links."
 
-        # Get all SimilarCategory where obj is involved
-        links = SimilarCategory.objects.filter(
-            models.Q(category_a=obj) | models.Q(category_b=obj)
-        )
-
-        # Pull out the "other" category in each pair
-        related_ids = {
-            link.category_b.id if link.category_a == obj else link.category_a.id
-            for link in links
-        }
-
-        if not related_ids:
+        names = SimilarityIndex.load([obj.id]).similar_names(obj.id)
+        if not names:
             return "—"
 
-        names = Category.objects.filter(id__in=related_ids).values_list("name", flat=True)
-        return ", ".join(sorted(names))
+        return ", ".join(names)
 
     similar_to.short_description = "Similar To"
 
@@ -81,26 +74,32 @@ class CategoryAdmin(nested_admin.NestedModelAdmin):
     readonly_fields = ["similar_to", "image_preview"]
 
     def move_buttons(self, obj):
+        # The rows sit inside the changelist form, which carries the CSRF token; a nested
+        # <form> would be dropped by the browser, so the buttons post that form instead
         up_url = reverse("admin:category-move-up", args=[obj.pk])
         down_url = reverse("admin:category-move-down", args=[obj.pk])
         return format_html(
-            '<a class="button" href="{}">⬆️</a>&nbsp;<a class="button" href="{}">⬇️</a>',
+            '<button type="submit" class="button" formmethod="post" formaction="{}">⬆️</button>&nbsp;'
+            '<button type="submit" class="button" formmethod="post" formaction="{}">⬇️</button>',
             up_url, down_url
         )
 
     move_buttons.short_description = "Reorder"
     list_display = ["id", "name", "parent", "move_buttons", view_similar_links]
 
-    @require_POST
+    @method_decorator(require_POST)
     def move_up_view(self, request, pk):
-        from .views import CategoryViewSet
-        CategoryViewSet()._move(pk, request._request, direction="up")
-        return redirect(request.META.get("HTTP_REFERER", "/admin/"))
+        return self._move(request, pk, -1)
 
-    @require_POST
+    @method_decorator(require_POST)
     def move_down_view(self, request, pk):
-        from .views import CategoryViewSet
-        CategoryViewSet()._move(pk, request._request, direction="down")
+        return self._move(request, pk, 1)
+
+    def _move(self, request, pk, offset):
+        try:
+            move_category(pk, offset)
+        except Category.DoesNotExist:
+            raise Http404
         return redirect(request.META.get("HTTP_REFERER", "/admin/"))
 
 
@@ -120,27 +119,88 @@ class SimilarCategoryAdmin(admin.ModelAdmin):
         return True
 
 
-# Admin view to return graph report JSON or download it
+@admin.register(GraphReport)
+class GraphReportAdmin(admin.ModelAdmin):
+    list_display = ["id", "status", "revision", "created_at", "finished_at"]
+    list_filter = ["status"]
+    readonly_fields = ["status", "revision", "file", "error", "created_at", "finished_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+def _report_status(report):
+    if report is None:
+        return None
+    return {
+        "id": report.pk,
+        "status": report.status,
+        "revision": report.revision,
+        "created_at": report.created_at,
+        "finished_at": report.finished_at,
+        "error": report.error,
+    }
+
+
+# Admin view serving the latest finished graph report; generation runs in the background
 def graph_analysis_report_view(request):
-    path, data = export_graph_analysis_to_json()
+    report = latest_graph_report()
+    if report is None:
+        job = request_graph_report()
+        return JsonResponse({"detail": "Report is being generated.", "job": _report_status(job)}, status=202)
 
+    response = FileResponse(report.file.open("rb"), content_type="application/json")
     if request.GET.get("download") == "1":
-        with open(path, "r") as f:
-            response = HttpResponse(f.read(), content_type="application/json")
-            response["Content-Disposition"] = "attachment; filename=graph_report.json"
-            return response
+        response["Content-Disposition"] = "attachment; filename=graph_report.json"
+    response["X-Graph-Revision"] = report.revision
+    if report.revision != graph_revision():
+        # Serve the stale report now and refresh it in the background
+        request_graph_report()
+        response["X-Graph-Report-Stale"] = "1"
+    return response
+
+
+@require_POST
+def graph_report_regenerate_view(request):
+    job = request_graph_report()
+    return JsonResponse({"job": _report_status(job)}, status=202)
+
+
+def graph_report_status_view(request):
+    latest = GraphReport.objects.first()
+    return JsonResponse({
+        "latest_job": _report_status(latest),
+        "latest_finished": _report_status(latest_graph_report()),
+        "current_revision": graph_revision(),
+    })
+
 
-    return JsonResponse(data, json_dumps_params={"indent": 2})
+def thumbnail_metrics_view(request):
+    return JsonResponse({**thumbnail_metrics(), "uploads": upload_metrics()})
 
 
 # Save the original method first
 original_get_urls = admin.site.get_urls
 
 
-# Add the custom view to the admin site's URLs
+# Add the custom views to the admin site's URLs
 def custom_admin_urls():
     return [
-        path("export-graph-report/", admin.site.admin_view(graph_analysis_report_view), name="graph_report")
+        path("export-graph-report/", admin.site.admin_view(graph_analysis_report_view), name="graph_report"),
+        path(
+            "export-graph-report/regenerate/",
+            admin.site.admin_view(graph_report_regenerate_view),
+            name="graph_report_regenerate",
+        ),
+        path(
+            "export-graph-report/status/",
+            admin.site.admin_view(graph_report_status_view),
+            name="graph_report_status",
+        ),
+        path("thumbnail-metrics/", admin.site.admin_view(thumbnail_metrics_view), name="thumbnail_metrics"),
     ] + original_get_urls()
 
 
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CatalogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'catalog'
+
+    def ready(self):
+        from PIL import Image
+
+        from catalog import signals  # noqa: F401
+        from catalog.images import max_image_pixels
+
+        # Pillow refuses to decode anything larger, whichever code path opens the file
+        Image.MAX_IMAGE_PIXELS = max_image_pixels()
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from catalog.graph_analysis import build_similarity_graph
+from catalog.models import Category
+from catalog.serializers import CategoryTreeSerializer
+from catalog.tree import CategoryTree
+
+VERSION_KEY = "catalog:version"
+SIMILARITY_VERSION_KEY = "catalog:similarity-version"
+
+# Per-process hit/miss counters for the rendered tree cache and the similarity graph
+stats = Counter()
+
+
+def _timeout():
+    return getattr(settings, "CATALOG_TREE_CACHE_TIMEOUT", None)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version lost to eviction is never handed out again
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def catalog_version():
+    return _version(VERSION_KEY)
+
+
+def bump_catalog_version():
+    _bump(VERSION_KEY)
+
+
+def similarity_version():
+    """Changes only when similarity links are written, unlike the catalog version."""
+    return _version(SIMILARITY_VERSION_KEY)
+
+
+def bump_similarity_version():
+    _bump(SIMILARITY_VERSION_KEY)
+
+
+def invalidate_catalog():
+    """
+    Bumps the catalog version now and again once the surrounding transaction commits,
+    so a reader that cached the pre-commit state in between is invalidated as well.
+    """
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
+
+
+def invalidate_similarity():
+    bump_similarity_version()
+    transaction.on_commit(bump_similarity_version)
+
+
+# (similarity version, graph) of the similarity graph cached in this process
+_graph_entry = (None, None)
+_graph_lock = threading.Lock()
+
+
+def get_similarity_graph():
+    """Returns the in-process similarity graph, rebuilt only after similarity writes."""
+    global _graph_entry
+    version = similarity_version()
+    cached_version, graph = _graph_entry
+    if cached_version == version:
+        stats["graph_hits"] += 1
+        return graph
+
+    with _graph_lock:
+        cached_version, graph = _graph_entry
+        if cached_version != version:
+            stats["graph_misses"] += 1
+            graph = build_similarity_graph()
+            _graph_entry = (version, graph)
+    return graph
+
+
+def _cached(key, render):
+    key = f"{key}:{catalog_version()}"
+    data = cache.get(key)
+    if data is not None:
+        stats["hits"] += 1
+        return data
+
+    stats["misses"] += 1
+    data = render()
+    cache.set(key, data, timeout=_timeout())
+    return data
+
+
+def get_tree_bytes():
+    """Returns the rendered JSON of the full category tree."""
+
+    def render():
+        tree = CategoryTree.load()
+        data = CategoryTreeSerializer(tree.roots(), many=True, context=tree.context).data
+        return JSONRenderer().render(data)
+
+    return _cached("catalog:tree", render)
+
+
+def get_subtree_bytes(category_id, max_depth=None, fields=None):
+    """
+    Returns the rendered JSON of the subtree rooted at category_id, down to max_depth
+    levels below it and limited to the given CategoryTreeSerializer fields.
+    """
+    fields = sorted(fields) if fields is not None else None
+
+    def render():
+        if fields is None:
+            tree = CategoryTree.load_subtrees([category_id], max_depth=max_depth)
+            context = tree.context
+        else:
+            tree = CategoryTree.load_subtrees(
+                [category_id],
+                max_depth=max_depth,
+                columns=CategoryTreeSerializer.columns_for(fields),
+                with_similarity="similar_to" in fields,
+            )
+            context = {**tree.context, "fields": fields}
+        if category_id not in tree.nodes:
+            raise Category.DoesNotExist(f"Category {category_id} does not exist.")
+        data = CategoryTreeSerializer(tree.nodes[category_id], context=context).data
+        return JSONRenderer().render(data)
+
+    key = f"catalog:subtree:{category_id}"
+    if max_depth is not None or fields is not None:
+        key += f":{max_depth}:{','.join(fields or ['*'])}"
+    return _cached(key, render)
@@ -0,0 +1,230 @@
+import csv
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from catalog.cache import invalidate_catalog
+from catalog.jobs import queue_thumbnails
+from catalog.models import PATH_SEPARATOR, Category
+from catalog.ordering import apply_moves
+
+IMPORT_BATCH_SIZE = 1000
+# External ids looked up per query, well below SQLite's limit on bound variables
+LOOKUP_BATCH_SIZE = 500
+
+CSV_FIELDS = ["external_id", "name", "description", "parent", "order", "image"]
+
+
+def records_from_csv(lines):
+    """Reads category records from CSV rows with a header naming the CSV_FIELDS columns."""
+    decoded = (line.decode("utf-8") if isinstance(line, bytes) else line for line in lines)
+    return list(csv.DictReader(decoded))
+
+
+def _normalize(record, position, errors):
+    if not isinstance(record, dict):
+        errors.append(f"Record {position}: expected an object.")
+        return None
+
+    external_id = str(record.get("external_id") or "").strip()
+    name = str(record.get("name") or "").strip()
+    parent = record.get("parent")
+    image = str(record.get("image") or "").strip() or None
+    if not external_id:
+        errors.append(f"Record {position}: external_id is required.")
+    elif len(external_id) > Category._meta.get_field("external_id").max_length:
+        errors.append(f"Record {position}: external_id is too long.")
+    if not name:
+        errors.append(f"Record {position}: name is required.")
+    elif len(name) > Category._meta.get_field("name").max_length:
+        errors.append(f"Record {position}: name is too long.")
+    try:
+        order = int(record.get("order") or 0)
+        if order < 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors.append(f"Record {position}: order must be a non-negative integer.")
+        order = 0
+    if image and (image.startswith("/") or "\\" in image or ".." in image.split("/")):
+        errors.append(f"Record {position}: image must be a relative path inside media storage.")
+        image = None
+
+    return {
+        "external_id": external_id,
+        "name": name,
+        "description": str(record.get("description") or ""),
+        "parent": str(parent).strip() if parent not in (None, "") else None,
+        "order": order,
+        "image": image,
+    }
+
+
+def _existing_categories(external_ids):
+    """Maps external id -> stored row of the categories already imported under those ids."""
+    existing = {}
+    external_ids = sorted(external_ids)
+    for start in range(0, len(external_ids), LOOKUP_BATCH_SIZE):
+        rows = Category.objects.filter(external_id__in=external_ids[start:start + LOOKUP_BATCH_SIZE]).values(
+            "external_id", "id", "parent_id", "path", "image", "image_hash", "thumbnail_pending"
+        )
+        existing.update((row["external_id"], row) for row in rows)
+    return existing
+
+
+def _levels(records, errors):
+    """
+    Groups records by their distance from the import roots, the records whose parent is
+    empty or already stored, so every level only refers to parents placed before it.
+    Records that are never reached sit on a parent cycle.
+    """
+    children = {}
+    for record in records.values():
+        parent = record["parent"] if record["parent"] in records else None
+        children.setdefault(parent, []).append(record)
+
+    levels = []
+    level = children.get(None, [])
+    while level:
+        levels.append(level)
+        level = [child for record in level for child in children.get(record["external_id"], [])]
+
+    placed = sum(len(level) for level in levels)
+    if placed < len(records):
+        reached = {record["external_id"] for level in levels for record in level}
+        cyclic = sorted(external_id for external_id in records if external_id not in reached)
+        errors.append(f"Parent references form a cycle: {', '.join(cyclic)}")
+    return levels
+
+
+def validate_category_records(raw_records):
+    """
+    Checks a whole import before anything is written: required fields, unique external
+    ids, parents that exist in the file or were imported before, images present in media
+    storage, unique names among siblings and no parent cycles.
+    Returns (records grouped by level, roots first; stored rows by external id), or
+    raises ValidationError.
+    """
+    errors = []
+    records = {}
+    for position, raw in enumerate(raw_records, start=1):
+        record = _normalize(raw, position, errors)
+        if record is None or not record["external_id"]:
+            continue
+        if record["external_id"] in records:
+            errors.append(f"Duplicate external_id: {record['external_id']}")
+            continue
+        records[record["external_id"]] = record
+
+    existing = _existing_categories(
+        set(records) | {record["parent"] for record in records.values() if record["parent"] is not None}
+    )
+    storage = Category._meta.get_field("image").storage
+    siblings = set()
+    for record in records.values():
+        if record["parent"] is not None and record["parent"] not in records and record["parent"] not in existing:
+            errors.append(f"{record['external_id']}: unknown parent {record['parent']}")
+        if record["image"] and not storage.exists(record["image"]):
+            errors.append(f"{record['external_id']}: image {record['image']} not found in media storage")
+        key = (record["parent"], record["name"])
+        if key in siblings:
+            errors.append(f"{record['external_id']}: duplicate name {record['name']!r} under the same parent")
+        siblings.add(key)
+
+    if not errors:
+        levels = _levels(records, errors)
+    if errors:
+        raise ValidationError(errors)
+    return levels, existing
+
+
+def import_categories(raw_records, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Syncs categories from records with `external_id` and `parent` (the parent's
+    external_id, empty for roots) references. The external id is stored, so a record
+    updates the category imported under it before, and a parent may be any category
+    imported earlier.
+
+    Every level of new categories is written with one bulk INSERT once its parents have
+    ids, and the materialized paths follow in a single bulk UPDATE; existing categories
+    are updated in bulk, and those given a new parent are moved with their subtrees.
+    Records may name an image already in media storage; their thumbnails are generated
+    on the job thread after commit.
+    Returns {"created", "updated", "ids"}, ids mapping external id to category id.
+    """
+    levels, existing = validate_category_records(raw_records)
+    ids = {external_id: row["id"] for external_id, row in existing.items()}
+    paths = {row["id"]: row["path"] for row in existing.values()}
+    created = {}
+    updated = []
+    moves = []
+    thumbnails = []
+    try:
+        with transaction.atomic():
+            for level in levels:
+                new_records = [record for record in level if record["external_id"] not in existing]
+                categories = [
+                    Category(
+                        external_id=record["external_id"],
+                        name=record["name"],
+                        description=record["description"],
+                        parent_id=ids.get(record["parent"]),
+                        order=record["order"],
+                        depth=paths.get(ids.get(record["parent"]), "").count(PATH_SEPARATOR),
+                        thumbnail_pending=bool(record["image"]),
+                        **({"image": record["image"]} if record["image"] else {}),
+                    )
+                    for record in new_records
+                ]
+                Category.objects.bulk_create(categories, batch_size=batch_size)
+                for record, category in zip(new_records, categories):
+                    ids[record["external_id"]] = category.pk
+                    parent_path = paths.get(category.parent_id, "")
+                    paths[category.pk] = created[category.pk] = f"{parent_path}{category.pk}{PATH_SEPARATOR}"
+                    if record["image"]:
+                        thumbnails.append(category.pk)
+
+                for record in level:
+                    row = existing.get(record["external_id"])
+                    if row is not None:
+                        updated.append(_updated_category(record, row, thumbnails))
+                        parent_id = ids.get(record["parent"])
+                        if parent_id != row["parent_id"]:
+                            moves.append({"id": row["id"], "parent": parent_id, "order": record["order"]})
+
+            Category.objects.bulk_update(
+                [Category(id=pk, path=path) for pk, path in created.items()], ["path"], batch_size=batch_size
+            )
+            Category.objects.bulk_update(
+                updated,
+                ["name", "description", "order", "image", "image_hash", "thumbnail_pending"],
+                batch_size=batch_size,
+            )
+            if moves:
+                apply_moves(moves)
+            queue_thumbnails(thumbnails)
+            invalidate_catalog()
+    except IntegrityError:
+        raise ValidationError("A category with this name already exists under the same parent.")
+
+    records = [record for level in levels for record in level]
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "ids": {record["external_id"]: ids[record["external_id"]] for record in records},
+    }
+
+
+def _updated_category(record, row, thumbnails):
+    category = Category(
+        id=row["id"],
+        name=record["name"],
+        description=record["description"],
+        order=record["order"],
+        image=row["image"],
+        image_hash=row["image_hash"],
+        thumbnail_pending=row["thumbnail_pending"],
+    )
+    if record["image"] and record["image"] != row["image"]:
+        category.image, category.image_hash, category.thumbnail_pending = record["image"], "", True
+        thumbnails.append(row["id"])
+    return category
@@ -0,0 +1,63 @@
+from rest_framework.renderers import JSONRenderer
+
+from catalog.images import default_variant_url
+from catalog.models import Category
+from catalog.serializers import CategoryTreeSerializer, pending_image_url
+from catalog.tree import CategoryTree
+
+EXPORT_CHUNK_SIZE = 2000
+
+FLAT_FIELDS = ["id", "name", "description", "image", "parent_id", "order", "depth"]
+
+
+def iter_flat_categories(chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields one plain dict per category, read through a chunked cursor."""
+    storage = Category._meta.get_field("image").storage
+    rows = Category.objects.order_by("parent_id", "order", "id").values_list(
+        *FLAT_FIELDS, "thumbnail_pending", "image_hash"
+    )
+    for pk, name, description, image, parent_id, order, depth, pending, image_hash in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        if pending:
+            image = pending_image_url()
+        elif image_hash:
+            image = default_variant_url(storage, image_hash)
+        elif image:
+            image = storage.url(image)
+        yield {
+            "id": pk,
+            "name": name,
+            "description": description,
+            "image": image or None,
+            "parent": parent_id,
+            "order": order,
+            "depth": depth,
+        }
+
+
+def iter_root_subtrees(chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the serialized subtree of each root category in sibling order. Only one
+    root's subtree is held in memory at a time.
+    """
+    root_ids = Category.objects.filter(parent__isnull=True).order_by("order", "id").values_list("id", flat=True)
+    for root_id in root_ids.iterator(chunk_size=chunk_size):
+        tree = CategoryTree.load_subtrees([root_id])
+        yield CategoryTreeSerializer(tree.nodes[root_id], context=tree.context).data
+
+
+def stream_json_array(items):
+    renderer = JSONRenderer()
+    yield b"["
+    for index, item in enumerate(items):
+        if index:
+            yield b","
+        yield renderer.render(item)
+    yield b"]"
+
+
+def stream_ndjson(items):
+    renderer = JSONRenderer()
+    for item in items:
+        yield renderer.render(item) + b"\n"
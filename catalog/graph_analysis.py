@@ -1,97 +1,419 @@
+import gzip
 import json
-from collections import deque, defaultdict
+import multiprocessing
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+from django.db.models import Count, Max
 
 from catalog.models import SimilarCategory, Category
 
+GRAPH_LOAD_CHUNK_SIZE = 10000
+
+
+class SimilarityGraph:
+    """
+    Undirected similarity graph in compressed sparse row (CSR) form.
+
+    Categories that have at least one link are numbered 0..n-1 in id order. The
+    neighbours of node i are targets[offsets[i]:offsets[i + 1]], stored as node
+    indices. Everything lives in contiguous array('q') buffers, 8 bytes per entry,
+    instead of a dict of Python int sets.
+    """
+
+    def __init__(self, node_ids, offsets, targets):
+        self.node_ids = node_ids
+        self.offsets = offsets
+        self.targets = targets
+
+    @classmethod
+    def from_edges(cls, edges):
+        sources = array("q")
+        destinations = array("q")
+        for a_id, b_id in edges:
+            sources.append(a_id)
+            destinations.append(b_id)
+
+        node_ids = array("q", sorted(set(sources) | set(destinations)))
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+        offsets = array("q", bytes(8 * (len(node_ids) + 1)))
+        for endpoints in (sources, destinations):
+            for node_id in endpoints:
+                offsets[index[node_id] + 1] += 1
+        for i in range(len(node_ids)):
+            offsets[i + 1] += offsets[i]
+
+        targets = array("q", bytes(8 * offsets[-1]))
+        cursor = array("q", offsets[:-1])
+        for a_id, b_id in zip(sources, destinations):
+            a, b = index[a_id], index[b_id]
+            targets[cursor[a]] = b
+            cursor[a] += 1
+            targets[cursor[b]] = a
+            cursor[b] += 1
+        return cls(node_ids, offsets, targets)
+
+    @classmethod
+    def load(cls, chunk_size=GRAPH_LOAD_CHUNK_SIZE):
+        """Builds the graph from the link table, streaming only the two FK ids."""
+        edges = SimilarCategory.objects.values_list("category_a_id", "category_b_id")
+        return cls.from_edges(edges.iterator(chunk_size=chunk_size))
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __iter__(self):
+        return iter(self.node_ids)
+
+    def __contains__(self, node_id):
+        return self.index_of(node_id) is not None
+
+    def index_of(self, node_id):
+        i = bisect_left(self.node_ids, node_id)
+        if i < len(self.node_ids) and self.node_ids[i] == node_id:
+            return i
+        return None
+
+    def neighbours(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def degree(self, i):
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def get(self, node_id, default=()):
+        """Neighbour ids of a category id, mirroring the old dict-of-sets interface."""
+        i = self.index_of(node_id)
+        if i is None:
+            return default
+        return [self.node_ids[j] for j in self.neighbours(i)]
+
+    def __getitem__(self, node_id):
+        return self.get(node_id)
+
+
+def graph_revision():
+    """
+    Cheap fingerprint of the category and link tables. Row counts and highest ids change
+    when rows are added or removed; the catalog version changes on every other write too,
+    such as a rename or a move.
+    """
+    from catalog.cache import catalog_version  # catalog.cache imports this module
+
+    categories = Category.objects.aggregate(count=Count("id"), last=Max("id"))
+    links = SimilarCategory.objects.aggregate(count=Count("id"), last=Max("id"))
+    return (
+        f"{categories['count']}.{categories['last'] or 0}-{links['count']}.{links['last'] or 0}"
+        f"-{catalog_version()}"
+    )
+
 
 def build_similarity_graph():
-    graph = defaultdict(set)
-    for rel in SimilarCategory.objects.select_related("category_a", "category_b"):
-        graph[rel.category_a_id].add(rel.category_b_id)
-        graph[rel.category_b_id].add(rel.category_a_id)
-    return graph
+    return SimilarityGraph.load()
 
 
 def find_rabbit_islands(graph, all_categories):
-    visited = set()
+    visited = bytearray(len(graph))
     islands = []
 
     def bfs(start):
         queue = deque([start])
-        component = {start}
-        visited.add(start)
+        component = {graph.node_ids[start]}
+        visited[start] = 1
 
         while queue:
             node = queue.popleft()
-            for neighbor in graph.get(node, []):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    component.add(neighbor)
+            for neighbor in graph.neighbours(node):
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    component.add(graph.node_ids[neighbor])
                     queue.append(neighbor)
         return component
 
-    for node in all_categories:
-        if node not in visited:
-            islands.append(bfs(node))
+    for node_id in all_categories:
+        i = graph.index_of(node_id)
+        if i is None:
+            islands.append({node_id})
+        elif not visited[i]:
+            islands.append(bfs(i))
 
     return islands
 
 
+def _bfs_levels(graph, start):
+    """BFS over node indices keeping one parent pointer per node. Returns (parents, nodes grouped by distance)."""
+    offsets, targets = graph.offsets, graph.targets
+    parents = {start: None}
+    levels = [[start]]
+    while True:
+        next_frontier = []
+        for node in levels[-1]:
+            for neighbor in targets[offsets[node]:offsets[node + 1]]:
+                if neighbor not in parents:
+                    parents[neighbor] = node
+                    next_frontier.append(neighbor)
+        if not next_frontier:
+            return parents, levels
+        levels.append(next_frontier)
 
-def find_diameter_of_island(graph, island):
-    def bfs_longest_path(start):
-        queue = deque([[start]])
-        seen = {start}
-        longest_path = []
 
-        while queue:
-            path = queue.popleft()
-            node = path[-1]
-            for neighbor in graph[node]:
-                if neighbor not in seen:
-                    seen.add(neighbor)
-                    new_path = path + [neighbor]
-                    queue.append(new_path)
-                    if len(new_path) > len(longest_path):
-                        longest_path = new_path
-        return longest_path
-
-    any_node = next(iter(island))
-    first_extreme = bfs_longest_path(any_node)
-    if not first_extreme:
+def _path_to(graph, parents, end):
+    """Walks parent pointers back from end and returns the path as category ids."""
+    path = []
+    while end is not None:
+        path.append(graph.node_ids[end])
+        end = parents[end]
+    path.reverse()
+    return path
+
+
+def find_diameter_of_island(graph, island, approximate=False):
+    """
+    Returns a longest shortest path of the island as a list of category ids.
+
+    The exact mode uses the BoundingDiameters algorithm (Takes & Kosters): every BFS from a
+    node v tightens per-node eccentricity bounds, ecc(v) - d(v, w) <= ecc(w) <= ecc(v) + d(v, w),
+    and nodes whose bounds can no longer change the diameter are pruned. On real-world graphs
+    this settles after a handful of BFS runs instead of one per node. The approximate mode
+    stops after the initial double sweep, which is exact on trees and a lower bound otherwise.
+    """
+    if len(island) <= 1:
         return []
+    island = [graph.index_of(node_id) for node_id in island]
+
+    # Double sweep: BFS to the farthest node a, then from a to its farthest node b
+    _, levels = _bfs_levels(graph, island[0])
+    parents, levels = _bfs_levels(graph, levels[-1][0])
+    best_parents, best_target = parents, levels[-1][0]
+    if approximate:
+        return _path_to(graph, best_parents, best_target)
+
+    lower_ecc = dict.fromkeys(island, 0)
+    upper_ecc = dict.fromkeys(island, len(island))
+    candidates = set(island)
+    diameter_lower, diameter_upper = len(levels) - 1, len(island)
+    pick_high = True
+
+    while candidates and diameter_lower < diameter_upper:
+        if pick_high:
+            source = max(candidates, key=lambda node: (upper_ecc[node], graph.degree(node)))
+        else:
+            source = min(candidates, key=lambda node: (lower_ecc[node], -graph.degree(node)))
+        pick_high = not pick_high
+
+        parents, levels = _bfs_levels(graph, source)
+        ecc = len(levels) - 1
+        if ecc > diameter_lower:
+            diameter_lower, best_parents, best_target = ecc, parents, levels[-1][0]
+        diameter_upper = min(diameter_upper, 2 * ecc)
+
+        for distance, level in enumerate(levels):
+            for node in level:
+                if node in candidates:
+                    lower_ecc[node] = max(lower_ecc[node], distance, ecc - distance)
+                    upper_ecc[node] = min(upper_ecc[node], ecc + distance)
 
-    second_extreme = bfs_longest_path(first_extreme[-1])
-    return second_extreme
+        candidates.discard(source)
+        diameter_upper = min(diameter_upper, max((upper_ecc[node] for node in candidates), default=0))
+        candidates = {
+            node for node in candidates
+            if lower_ecc[node] != upper_ecc[node]
+            and not (upper_ecc[node] <= diameter_lower and lower_ecc[node] >= (diameter_upper + 1) // 2)
+        }
 
+    return _path_to(graph, best_parents, best_target)
 
-def format_category_path(category_ids):
-    id_to_name = dict(Category.objects.values_list("id", "name"))
+
+# Set in the parent right before the worker pool forks, so workers inherit the graph
+# and island list through copy-on-write memory instead of receiving them pickled per task.
+_shared_graph = None
+_shared_islands = None
+
+
+def _island_diameter(task):
+    index, approximate = task
+    return index, find_diameter_of_island(_shared_graph, _shared_islands[index], approximate=approximate)
+
+
+def compute_island_diameters(graph, islands, approximate_above=None, workers=1):
+    """
+    Returns the diameter path of every island, in island order. With workers > 1 the
+    islands are spread over a fork-based process pool, largest first; the result does
+    not depend on the number of workers.
+    """
+    global _shared_graph, _shared_islands
+
+    tasks = [
+        (index, approximate_above is not None and len(island) > approximate_above)
+        for index, island in enumerate(islands)
+        if len(island) > 1
+    ]
+    paths = [[] for _ in islands]
+    if workers <= 1 or len(tasks) < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        _shared_graph, _shared_islands = graph, islands
+        try:
+            results = map(_island_diameter, tasks)
+            for index, path in results:
+                paths[index] = path
+        finally:
+            _shared_graph = _shared_islands = None
+        return paths
+
+    tasks.sort(key=lambda task: len(islands[task[0]]), reverse=True)
+    # Forked children must not share the parent's database sockets
+    connections.close_all()
+    _shared_graph, _shared_islands = graph, islands
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            for index, path in pool.map(_island_diameter, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+                paths[index] = path
+    finally:
+        _shared_graph = _shared_islands = None
+    return paths
+
+
+def load_category_names():
+    return dict(Category.objects.values_list("id", "name"))
+
+
+def format_category_path(category_ids, names=None):
+    id_to_name = names if names is not None else load_category_names()
     return [{"id": cid, "name": id_to_name.get(cid, f"[Unknown:{cid}]")} for cid in category_ids]
 
 
-def export_graph_analysis_to_json(path="graph_report.json"):
+def _open_report(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def _write_json_report(f, longest_rabbit_hole, islands, names, indent):
+    """Writes the report object island by island, never holding more than one island's JSON."""
+    newline = "\n" if indent else ""
+    pad = " " * (indent or 0)
+
+    def dump(value, level):
+        text = json.dumps(value, indent=indent, ensure_ascii=False, separators=None if indent else (",", ":"))
+        return text.replace("\n", "\n" + pad * level) if indent else text
+
+    separator = ": " if indent else ":"
+    f.write("{" + newline)
+    f.write(f'{pad}"longest_rabbit_hole"{separator}{dump(longest_rabbit_hole, 1)},{newline}')
+    f.write(f'{pad}"rabbit_islands"{separator}[')
+    for index, island in enumerate(islands):
+        f.write(("," if index else "") + newline + pad * 2)
+        f.write(dump(format_category_path(sorted(island), names), 2))
+    f.write((newline + pad if islands else "") + "]" + newline + "}\n")
+
+
+def _write_ndjson_report(f, longest_rabbit_hole, islands, names):
+    f.write(json.dumps({"longest_rabbit_hole": longest_rabbit_hole}, ensure_ascii=False) + "\n")
+    for island in islands:
+        f.write(json.dumps({"rabbit_island": format_category_path(sorted(island), names)}, ensure_ascii=False) + "\n")
+
+
+def export_graph_analysis_to_json(
+    path="graph_report.json",
+    approximate_above=None,
+    workers=1,
+    indent=2,
+    compress=False,
+    output_format="json",
+):
+    """
+    Islands larger than approximate_above nodes get the approximate (double sweep)
+    diameter instead of the exact one; workers > 1 computes diameters in parallel.
+
+    The report is streamed to disk one island at a time, as a JSON object or as
+    NDJSON (output_format="ndjson"), optionally gzip-compressed. Returns the path and
+    a summary with the longest rabbit hole and the island count.
+    """
     graph = build_similarity_graph()
     all_categories = list(Category.objects.values_list('id', flat=True))
     islands = find_rabbit_islands(graph, all_categories)
 
     longest_path = []
-    for island in islands:
-        curr_path = find_diameter_of_island(graph, island)
+    for curr_path in compute_island_diameters(graph, islands, approximate_above, workers):
         if len(curr_path) > len(longest_path):
             longest_path = curr_path
 
-    report = {
-        "longest_rabbit_hole": {
-            "length": max(len(longest_path) - 1, 0),
-            "path": format_category_path(longest_path),
-        },
-        "rabbit_islands": [
-            format_category_path(sorted(island)) for island in islands
-        ],
+    names = load_category_names()
+    longest_rabbit_hole = {
+        "length": max(len(longest_path) - 1, 0),
+        "path": format_category_path(longest_path, names),
     }
 
-    with open(path, "w") as f:
-        json.dump(report, f, indent=2)
+    with _open_report(path, compress) as f:
+        if output_format == "ndjson":
+            _write_ndjson_report(f, longest_rabbit_hole, islands, names)
+        else:
+            _write_json_report(f, longest_rabbit_hole, islands, names, indent)
+
+    return path, {"longest_rabbit_hole": longest_rabbit_hole, "rabbit_islands": len(islands)}
+
+
+def k_hop_neighbourhood(graph, node_id, hops, limit=None):
+    """Returns [(category id, distance)] for every category within `hops` links, nearest first."""
+    start = graph.index_of(node_id)
+    if start is None:
+        return []
+
+    seen = {start}
+    frontier = [start]
+    found = []
+    for distance in range(1, hops + 1):
+        next_frontier = []
+        for node in frontier:
+            for neighbor in graph.neighbours(node):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    next_frontier.append(neighbor)
+                    found.append((graph.node_ids[neighbor], distance))
+                    if limit is not None and len(found) >= limit:
+                        return found
+        frontier = next_frontier
+    return found
+
+
+def shortest_path(graph, source_id, target_id):
+    """
+    Bidirectional BFS between two categories. Always expands the smaller frontier,
+    so it touches roughly 2 * b^(d/2) nodes instead of b^d. Returns the path as
+    category ids, or None when the categories are not connected.
+    """
+    source, target = graph.index_of(source_id), graph.index_of(target_id)
+    if source_id == target_id:
+        return [source_id]
+    if source is None or target is None:
+        return None
+
+    forward_parents, backward_parents = {source: None}, {target: None}
+    forward, backward = [source], [target]
+    while forward and backward:
+        if len(forward) > len(backward):
+            forward, backward = backward, forward
+            forward_parents, backward_parents = backward_parents, forward_parents
+            source, target = target, source
 
-    return path, report
+        next_frontier = []
+        meeting = None
+        for node in forward:
+            for neighbor in graph.neighbours(node):
+                if neighbor not in forward_parents:
+                    forward_parents[neighbor] = node
+                    next_frontier.append(neighbor)
+                    if neighbor in backward_parents:
+                        meeting = neighbor
+                        break
+            if meeting is not None:
+                break
+        if meeting is not None:
+            head = _path_to(graph, forward_parents, meeting)
+            tail = _path_to(graph, backward_parents, meeting)[::-1][1:]
+            path = head + tail
+            return path if path[0] == source_id else path[::-1]
+        forward = next_frontier
+    return None
@@ -0,0 +1,143 @@
+"""
+Storage and responsive variants of category images. Files are named by the hash of
+the uploaded bytes, so uploading the same picture twice stores it, and its variants,
+only once. Names are sharded by the leading hash digits (`ab/cd/<hash>.jpg`) to keep
+directories small, and every access goes through the Storage API, so any backend
+(local disk, S3-compatible object storage) can hold them.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+STORAGE_ALIAS = "category_images"
+ORIGINAL_DIR = "category_images/originals"
+VARIANT_DIR = "category_images/variants"
+
+MAX_IMAGE_BYTES = 1 * 1024 * 1024  # 1MB
+ALLOWED_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+DEFAULT_MAX_IMAGE_PIXELS = 4096 * 4096
+
+DEFAULT_VARIANT_SIZES = (48, 100, 320, 640)
+DEFAULT_VARIANT_FORMATS = ("webp", "jpeg")
+
+# Pillow format name, file extension and save options per variant format
+_FORMATS = {
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+
+
+def max_image_pixels():
+    """Largest width * height accepted on upload and decoded by Pillow."""
+    return getattr(settings, "CATEGORY_IMAGE_MAX_PIXELS", DEFAULT_MAX_IMAGE_PIXELS)
+
+
+def variant_sizes():
+    return sorted(getattr(settings, "CATEGORY_IMAGE_VARIANT_SIZES", DEFAULT_VARIANT_SIZES), reverse=True)
+
+
+def variant_formats():
+    return list(getattr(settings, "CATEGORY_IMAGE_VARIANT_FORMATS", DEFAULT_VARIANT_FORMATS))
+
+
+def default_variant():
+    """The (size, format) served as the plain `image` URL, the successor of the old 100px thumbnail."""
+    return tuple(getattr(settings, "CATEGORY_IMAGE_DEFAULT_VARIANT", (100, "jpeg")))
+
+
+def image_storage():
+    """The STORAGES entry named "category_images", falling back to the default storage."""
+    return storages[STORAGE_ALIAS if STORAGE_ALIAS in settings.STORAGES else "default"]
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _shard(image_hash):
+    return f"{image_hash[:2]}/{image_hash[2:4]}"
+
+
+def original_name(image_hash, extension):
+    return f"{ORIGINAL_DIR}/{_shard(image_hash)}/{image_hash}{extension.lower()}"
+
+
+def variant_name(image_hash, size, fmt):
+    return f"{VARIANT_DIR}/{_shard(image_hash)}/{image_hash}_{size}.{_FORMATS[fmt][1]}"
+
+
+def upload_path(instance, filename):
+    """upload_to of Category.image: the content-addressed name of the file being uploaded."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in instance.image.chunks():
+        hasher.update(chunk)
+    instance.image.seek(0)
+    return original_name(hasher.hexdigest(), os.path.splitext(filename)[1])
+
+
+def variant_urls(storage, image_hash):
+    """Maps format -> {size: url} for every configured variant of an image."""
+    return {
+        fmt: {str(size): storage.url(variant_name(image_hash, size, fmt)) for size in sorted(variant_sizes())}
+        for fmt in variant_formats()
+    }
+
+
+def default_variant_url(storage, image_hash):
+    size, fmt = default_variant()
+    return storage.url(variant_name(image_hash, size, fmt))
+
+
+def render_variants(data, sizes, formats):
+    """
+    Yields (size, format, encoded bytes) for every requested variant from a single decode.
+
+    JPEG sources are decoded straight at the smallest DCT scale (1/2 to 1/8) that still
+    covers the largest size via draft(). Sizes are then produced largest first, each
+    from the previous one, with thumbnail(reducing_gap=...) applying a cheap integer
+    reduce() before the final resample.
+    """
+    largest = max(sizes)
+    with Image.open(BytesIO(data)) as img:
+        img.draft("RGB", (largest, largest))
+        current = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    for size in sorted(sizes, reverse=True):
+        current.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        for fmt in formats:
+            pillow_format, _, options = _FORMATS[fmt]
+            frame = current.convert("RGB") if pillow_format == "JPEG" and current.mode != "RGB" else current
+            buffer = BytesIO()
+            frame.save(buffer, pillow_format, **options)
+            yield size, fmt, buffer.getvalue()
+
+
+def store_image_variants(storage, name):
+    """
+    Stores the image at `name` under its content hash together with all configured
+    variants, skipping files that an identical upload already produced. Uploads already
+    arrive under their hashed name; legacy images are copied there.
+    Returns (hashed name, content hash).
+
+    The file at `name` itself is left in place, as other rows may still refer to it.
+    """
+    with storage.open(name, "rb") as f:
+        data = f.read()
+    image_hash = content_hash(data)
+
+    hashed_name = original_name(image_hash, os.path.splitext(name)[1])
+    if hashed_name != name and not storage.exists(hashed_name):
+        hashed_name = storage.save(hashed_name, ContentFile(data))
+
+    sizes, formats = variant_sizes(), variant_formats()
+    if not all(storage.exists(variant_name(image_hash, size, fmt)) for size in sizes for fmt in formats):
+        for size, fmt, encoded in render_variants(data, sizes, formats):
+            target = variant_name(image_hash, size, fmt)
+            if not storage.exists(target):
+                storage.save(target, ContentFile(encoded))
+    return hashed_name, image_hash
@@ -0,0 +1,128 @@
+"""
+Persistent index of similarity islands (connected components of the similarity graph).
+
+Every category stores the label of its island in Category.island_id. A label is always
+the id of one of the island's members, and a category without links keeps NULL, which
+stands for its own id. Creating a link merges two islands by relabelling the smaller one;
+deleting a link re-runs BFS inside the affected island only.
+"""
+from collections import defaultdict, deque
+
+from django.db import transaction
+from django.db.models import Q
+
+from catalog.graph_analysis import build_similarity_graph, find_rabbit_islands
+from catalog.models import Category, SimilarCategory
+
+# Rows relabelled per UPDATE, well below SQLite's limit on bound variables
+RELABEL_BATCH_SIZE = 500
+
+
+def island_of(category_id):
+    island_id = Category.objects.values_list("island_id", flat=True).get(pk=category_id)
+    return island_id if island_id is not None else category_id
+
+
+def island_members(island_id):
+    members = list(Category.objects.filter(island_id=island_id).values_list("id", flat=True))
+    return members or [island_id]
+
+
+def load_islands(include_singletons=True):
+    """Returns {island label: set of category ids}, read from the index in one query."""
+    islands = defaultdict(set)
+    rows = Category.objects.values_list("id", "island_id")
+    if not include_singletons:
+        rows = rows.filter(island_id__isnull=False)
+    for pk, island_id in rows.order_by("id").iterator():
+        islands[island_id if island_id is not None else pk].add(pk)
+    return dict(islands)
+
+
+def merge_islands(a_id, b_id):
+    """Union step for a newly created link a-b."""
+    with transaction.atomic():
+        labels = dict(
+            Category.objects.select_for_update().filter(pk__in=[a_id, b_id]).values_list("id", "island_id")
+        )
+        island_a = labels[a_id] if labels[a_id] is not None else a_id
+        island_b = labels[b_id] if labels[b_id] is not None else b_id
+        if island_a == island_b:
+            return island_a
+
+        size_a = Category.objects.filter(island_id=island_a).count() if labels[a_id] is not None else 1
+        size_b = Category.objects.filter(island_id=island_b).count() if labels[b_id] is not None else 1
+        keep, drop = (island_a, island_b) if size_a >= size_b else (island_b, island_a)
+
+        Category.objects.filter(Q(island_id=drop) | Q(pk__in=[a_id, b_id])).update(island_id=keep)
+        return keep
+
+
+def split_island(a_id, b_id):
+    """Local recomputation after the link a-b was deleted."""
+    with transaction.atomic():
+        label = Category.objects.select_for_update().filter(pk=a_id).values_list("island_id", flat=True).first()
+        if label is None:
+            return
+
+        members = set(Category.objects.filter(island_id=label).values_list("id", flat=True))
+        graph = defaultdict(list)
+        links = SimilarCategory.objects.filter(category_a__island_id=label).values_list(
+            "category_a_id", "category_b_id"
+        )
+        for x, y in links:
+            graph[x].append(y)
+            graph[y].append(x)
+
+        remaining = set(members)
+        components = []
+        for start in (a_id, b_id):
+            if start not in remaining:
+                continue
+            component = _reachable(graph, start)
+            remaining -= component
+            components.append(component)
+        if len(components) < 2:
+            return
+
+        for component in components:
+            if len(component) == 1:
+                _relabel(component, None)
+            elif label not in component:
+                _relabel(component, min(component))
+
+
+def _relabel(category_ids, island_id):
+    category_ids = sorted(category_ids)
+    for start in range(0, len(category_ids), RELABEL_BATCH_SIZE):
+        batch = category_ids[start:start + RELABEL_BATCH_SIZE]
+        Category.objects.filter(pk__in=batch).update(island_id=island_id)
+
+
+def _reachable(graph, start):
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for neighbor in graph[node]:
+            if neighbor not in seen:
+                seen.add(neighbor)
+                queue.append(neighbor)
+    return seen
+
+
+def rebuild_islands(batch_size=1000):
+    """Recomputes every label from a full graph build. Returns the number of rows changed."""
+    graph = build_similarity_graph()
+    expected = {}
+    for island in find_rabbit_islands(graph, graph.node_ids):
+        label = min(island)
+        expected.update(dict.fromkeys(island, label))
+
+    changed = [
+        Category(id=pk, island_id=expected.get(pk))
+        for pk, island_id in Category.objects.values_list("id", "island_id").iterator()
+        if island_id != expected.get(pk)
+    ]
+    Category.objects.bulk_update(changed, ["island_id"], batch_size=batch_size)
+    return len(changed)
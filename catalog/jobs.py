@@ -0,0 +1,163 @@
+"""
+In-process background jobs. Work runs on a small thread pool owned by the worker
+process, so no external broker is needed; job state lives in the database.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.cache import invalidate_catalog
+from catalog.graph_analysis import export_graph_analysis_to_json, graph_revision
+from catalog.models import Category, GraphReport
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-jobs")
+# Futures of the graph reports submitted by this process, by report id
+_report_futures = {}
+
+# A pending or running report older than this is taken to have died with its worker
+DEFAULT_GRAPH_REPORT_TIMEOUT = 30 * 60
+
+# Thumbnails get their own pool so they never queue behind a long graph report
+_thumbnail_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "CATEGORY_THUMBNAIL_WORKERS", 2), thread_name_prefix="catalog-thumbnails"
+)
+_thumbnail_lock = threading.Lock()
+# Per-process counters of the thumbnail pool; processing_seconds is the summed wall time
+thumbnail_stats = Counter()
+
+
+def latest_graph_report():
+    return GraphReport.objects.filter(status=GraphReport.Status.DONE).first()
+
+
+def expire_stale_graph_reports():
+    """
+    Marks pending and running reports as failed when they are older than
+    GRAPH_REPORT_TIMEOUT seconds, or when their job in this process has already ended
+    without finishing them. Their executor is gone after a worker restart or crash, so
+    they would otherwise block regeneration forever. Returns the number of reports expired.
+    """
+    timeout = getattr(settings, "GRAPH_REPORT_TIMEOUT", DEFAULT_GRAPH_REPORT_TIMEOUT)
+    ended = [pk for pk, future in list(_report_futures.items()) if future.done()]
+    for pk in ended:
+        _report_futures.pop(pk, None)
+    return (
+        GraphReport.objects.filter(status__in=[GraphReport.Status.PENDING, GraphReport.Status.RUNNING])
+        .filter(Q(created_at__lt=timezone.now() - timedelta(seconds=timeout)) | Q(pk__in=ended))
+        .update(status=GraphReport.Status.FAILED, error="The report job was lost.", finished_at=timezone.now())
+    )
+
+
+def request_graph_report():
+    """Queues a new report unless a live one is already pending or running, and returns that job."""
+    with transaction.atomic():
+        expire_stale_graph_reports()
+        active = (
+            GraphReport.objects.select_for_update()
+            .filter(status__in=[GraphReport.Status.PENDING, GraphReport.Status.RUNNING])
+            .first()
+        )
+        if active is not None:
+            return active
+        report = GraphReport.objects.create()
+        transaction.on_commit(lambda: _submit_graph_report(report.pk))
+    return report
+
+
+def _submit_graph_report(report_id):
+    _report_futures[report_id] = _executor.submit(run_graph_report, report_id)
+
+
+def run_graph_report(report_id):
+    """Generates the report file for a queued job. Runs on the job thread."""
+    close_old_connections()
+    try:
+        report = GraphReport.objects.get(pk=report_id)
+        report.status = GraphReport.Status.RUNNING
+        report.revision = graph_revision()
+        report.save(update_fields=["status", "revision"])
+
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                path, _ = export_graph_analysis_to_json(os.path.join(workdir, "graph_report.json"))
+                stamp = timezone.now().strftime("%Y%m%dT%H%M%S")
+                with open(path, "rb") as f:
+                    report.file.save(f"graph_report_{stamp}_{report.revision}.json", File(f), save=False)
+        except Exception as exc:
+            report.status = GraphReport.Status.FAILED
+            report.error = repr(exc)
+        else:
+            report.status = GraphReport.Status.DONE
+        report.finished_at = timezone.now()
+        report.save(update_fields=["status", "file", "error", "finished_at"])
+    finally:
+        close_old_connections()
+
+
+def queue_thumbnails(category_ids):
+    """Generates thumbnails for the given categories on the thumbnail pool once the transaction commits."""
+    category_ids = list(category_ids)
+    if category_ids:
+        transaction.on_commit(lambda: _submit_thumbnails(category_ids))
+
+
+def _submit_thumbnails(category_ids):
+    with _thumbnail_lock:
+        thumbnail_stats["queued"] += len(category_ids)
+    _thumbnail_executor.submit(run_thumbnails, category_ids)
+
+
+def run_thumbnails(category_ids):
+    """
+    Renders the variants of each category image and clears the pending flag.
+    A row whose image changed again in the meantime is left to the job queued for that change.
+    """
+    close_old_connections()
+    try:
+        for category in Category.objects.filter(pk__in=category_ids).only("id", "image"):
+            stored_image = category.image.name
+            started = time.perf_counter()
+            try:
+                changed = category.generate_thumbnail()
+            except Exception:
+                changed = False
+                outcome = "failed"
+            else:
+                outcome = "processed"
+            with _thumbnail_lock:
+                thumbnail_stats[outcome] += 1
+                thumbnail_stats["processing_seconds"] += time.perf_counter() - started
+
+            updates = {"thumbnail_pending": False}
+            if changed:
+                updates.update(image=category.image.name, image_hash=category.image_hash)
+            Category.objects.filter(pk=category.pk, image=stored_image).update(**updates)
+        invalidate_catalog()
+    finally:
+        with _thumbnail_lock:
+            thumbnail_stats["finished"] += len(category_ids)
+        close_old_connections()
+
+
+def thumbnail_metrics():
+    """Queue depth and processing times of this process's thumbnail pool, plus the pending rows overall."""
+    with _thumbnail_lock:
+        stats = thumbnail_stats.copy()
+    handled = stats["processed"] + stats["failed"]
+    return {
+        "queue_depth": stats["queued"] - stats["finished"],
+        "pending": Category.objects.filter(thumbnail_pending=True).count(),
+        "processed": stats["processed"],
+        "failed": stats["failed"],
+        "avg_processing_ms": round(1000 * stats["processing_seconds"] / handled, 2) if handled else None,
+    }
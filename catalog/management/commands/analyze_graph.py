@@ -8,7 +8,38 @@ from catalog.graph_analysis import export_graph_analysis_to_json
 class Command(BaseCommand):
     help = "Analyze the similarity graph and output the longest rabbit hole and all rabbit islands."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--approximate-above",
+            type=int,
+            default=None,
+            help="Use the approximate diameter for islands with more than this many categories.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes computing island diameters in parallel.",
+        )
+        parser.add_argument("--output", default=None, help="Report path (default: graph_report.json).")
+        parser.add_argument("--format", choices=["json", "ndjson"], default="json", dest="output_format")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the report.")
+        parser.add_argument("--compact", action="store_true", help="Write JSON without indentation.")
+
     def handle(self, *args, **kwargs):
-        path, data = export_graph_analysis_to_json()
+        path = kwargs["output"]
+        if path is None:
+            path = "graph_report.ndjson" if kwargs["output_format"] == "ndjson" else "graph_report.json"
+            if kwargs["gzip"]:
+                path += ".gz"
+
+        path, summary = export_graph_analysis_to_json(
+            path,
+            approximate_above=kwargs["approximate_above"],
+            workers=kwargs["workers"],
+            indent=None if kwargs["compact"] else 2,
+            compress=kwargs["gzip"],
+            output_format=kwargs["output_format"],
+        )
         self.stdout.write(self.style.SUCCESS(f"\n✅ Graph analysis saved to: {path}\n"))
-        pprint(data)
+        pprint(summary, stream=self.stdout)
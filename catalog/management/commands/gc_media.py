@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from catalog.media_gc import DEFAULT_MIN_AGE, collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete category image files under MEDIA_ROOT that no category refers to."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+        parser.add_argument("--workers", type=int, default=4, help="Threads deleting files in parallel.")
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=DEFAULT_MIN_AGE,
+            help="Skip files modified less than this many seconds ago.",
+        )
+        parser.add_argument("--list", action="store_true", help="Print every orphaned file.")
+
+    def handle(self, *args, **options):
+        report = collect_garbage(dry_run=options["dry_run"], workers=options["workers"], min_age=options["min_age"])
+        if options["list"] or options["dry_run"]:
+            for name, size in report["orphans"]:
+                self.stdout.write(f"{name} ({size} bytes)")
+
+        megabytes = report["reclaimed_bytes"] / (1024 * 1024)
+        if options["dry_run"]:
+            summary = f"Would delete {report['orphaned']} of {report['scanned']} files, reclaiming {megabytes:.2f} MB."
+        else:
+            summary = f"Deleted {report['deleted']} of {report['scanned']} files, reclaimed {megabytes:.2f} MB."
+        self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
+        for name, error in report["errors"]:
+            self.stderr.write(f"Could not delete {name}: {error}")
@@ -0,0 +1,36 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.category_import import IMPORT_BATCH_SIZE, import_categories, records_from_csv
+
+
+class Command(BaseCommand):
+    help = "Bulk-import or sync a category tree from a JSON or CSV file of records with external ids and parent references."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["json", "csv"],
+            default=None,
+            dest="input_format",
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["input_format"] or ("csv" if path.endswith(".csv") else "json")
+
+        with open(path, encoding="utf-8", newline="") as f:
+            records = records_from_csv(f) if input_format == "csv" else json.load(f)
+
+        try:
+            report = import_categories(records, batch_size=options["batch_size"])
+        except ValidationError as exc:
+            raise CommandError("\n".join(exc.messages))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {report['created']} new and updated {report['updated']} existing categories."
+        ))
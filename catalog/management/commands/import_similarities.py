@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.similarity_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_similarities, parse_pairs
+
+
+class Command(BaseCommand):
+    help = "Bulk-import similarity pairs from a CSV (a,b rows) or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            default=None,
+            dest="input_format",
+            help="Input format (default: from the file extension).",
+        )
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        input_format = options["input_format"]
+        if input_format is None:
+            input_format = next((fmt for fmt in IMPORT_FORMATS if path.endswith(f".{fmt}")), None)
+            if input_format is None:
+                raise CommandError("Cannot tell the format from the file name, pass --format.")
+
+        if path == "-":
+            counts = import_similarities(parse_pairs(sys.stdin, input_format), batch_size=options["batch_size"])
+        else:
+            with open(path, encoding="utf-8", newline="") as f:
+                counts = import_similarities(parse_pairs(f, input_format), batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {counts['inserted']} similarities "
+            f"({counts['duplicate']} duplicate, {counts['invalid']} invalid)."
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from catalog.jobs import run_thumbnails
+from catalog.models import Category
+
+
+class Command(BaseCommand):
+    help = "Generate the thumbnails still marked pending, e.g. jobs lost when a worker restarted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Also render variants for stored images that predate them.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = Category.objects.filter(thumbnail_pending=True)
+        if options["missing"]:
+            queryset |= Category.objects.filter(image_hash="").exclude(image="").exclude(image__isnull=True)
+        pending = list(queryset.values_list("id", flat=True))
+        batch_size = options["batch_size"]
+        for start in range(0, len(pending), batch_size):
+            run_thumbnails(pending[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"✅ Processed {len(pending)} pending thumbnails."))
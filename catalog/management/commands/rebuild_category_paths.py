@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.tree import find_path_mismatches, rebuild_paths
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the materialized path and depth columns of the category tree."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--verify", action="store_true", help="Only report stale rows, do not rewrite them.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            mismatches = find_path_mismatches()
+            for pk, stored, expected in mismatches:
+                self.stdout.write(f"Category {pk}: stored {stored!r}, expected {expected!r}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} categories have a stale tree encoding.")
+            self.stdout.write(self.style.SUCCESS("✅ Category tree encoding is consistent."))
+            return
+
+        fixed = rebuild_paths(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt tree encoding for {fixed} categories."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from catalog.islands import rebuild_islands
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored similarity island of every category from the full graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        changed = rebuild_islands(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt island index, {changed} categories relabelled."))
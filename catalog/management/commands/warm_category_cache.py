@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from catalog.cache import catalog_version, get_subtree_bytes, get_tree_bytes, stats
+from catalog.models import Category
+
+
+class Command(BaseCommand):
+    help = "Render the category tree into the cache so the first storefront request is a hit."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subtrees", action="store_true", help="Also warm the subtree of every root category.")
+
+    def handle(self, *args, **options):
+        size = len(get_tree_bytes())
+        warmed = 1
+        if options["subtrees"]:
+            for pk in Category.objects.filter(parent__isnull=True).values_list("id", flat=True):
+                get_subtree_bytes(pk)
+                warmed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Warmed {warmed} cache entries for catalog version {catalog_version()} "
+            f"(tree: {size} bytes, hits: {stats['hits']}, misses: {stats['misses']})"
+        ))
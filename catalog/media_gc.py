@@ -0,0 +1,151 @@
+"""
+Removal of category image files that no row refers to any more: right after a delete
+for the files the deleted row held, and in bulk by the gc_media command for whatever
+slipped through (replaced uploads, rejected requests, crashed workers).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from catalog.images import variant_formats, variant_name, variant_sizes
+from catalog.models import Category
+
+MEDIA_DIR = "category_images"
+
+# Files younger than this are kept: their row may not be committed or their variants not rendered yet
+DEFAULT_MIN_AGE = 60 * 60
+
+
+def _variant_names(image_hash):
+    return {variant_name(image_hash, size, fmt) for size in variant_sizes() for fmt in variant_formats()}
+
+
+def _protected_names():
+    return {Category._meta.get_field("image").get_default(), settings.CATEGORY_IMAGE_PENDING}
+
+
+def referenced_media_names():
+    """Every media name a category refers to, directly or through its variants, read in one query."""
+    names = _protected_names()
+    for image, image_hash in Category.objects.values_list("image", "image_hash").iterator(chunk_size=5000):
+        if image:
+            names.add(image)
+        if image_hash:
+            names.update(_variant_names(image_hash))
+    return names
+
+
+def delete_unreferenced_files(image, image_hash):
+    """
+    Deletes the image file and variants a removed category held, unless another row
+    shares them (identical uploads are stored once). Returns the names deleted.
+    """
+    storage = Category._meta.get_field("image").storage
+    candidates = set()
+    if image and image not in _protected_names():
+        if not Category.objects.filter(image=image).exists():
+            candidates.add(image)
+    if image_hash and not Category.objects.filter(image_hash=image_hash).exists():
+        candidates |= _variant_names(image_hash)
+
+    deleted = []
+    for name in sorted(candidates):
+        if storage.exists(name):
+            storage.delete(name)
+            deleted.append(name)
+    return deleted
+
+
+def _scan_local(root, cutoff):
+    stack = [os.path.join(root, MEDIA_DIR)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime <= cutoff:
+                    yield os.path.relpath(entry.path, root).replace(os.sep, "/"), stat.st_size
+
+
+def _scan_storage(storage, cutoff):
+    stack = [MEDIA_DIR]
+    while stack:
+        directory = stack.pop()
+        directories, files = storage.listdir(directory)
+        stack.extend(f"{directory}/{name}" for name in directories)
+        for filename in files:
+            name = f"{directory}/{filename}"
+            try:
+                if storage.get_modified_time(name).timestamp() > cutoff:
+                    continue
+            except NotImplementedError:
+                pass
+            yield name, storage.size(name)
+
+
+def scan_media(storage, min_age=DEFAULT_MIN_AGE):
+    """
+    Yields (media name, size) for every file under MEDIA_DIR older than min_age seconds.
+    Local storage is walked with os.scandir, which returns the stat data with the listing;
+    other backends go through Storage.listdir.
+    """
+    cutoff = time.time() - min_age
+    if isinstance(storage, FileSystemStorage):
+        return _scan_local(storage.location, cutoff)
+    return _scan_storage(storage, cutoff)
+
+
+def _delete(storage, name):
+    """Deletes one file, returning the error instead of raising it so one failure does not stop the run."""
+    try:
+        storage.delete(name)
+    except Exception as exc:
+        return exc
+    return None
+
+
+def collect_garbage(dry_run=False, workers=4, min_age=DEFAULT_MIN_AGE):
+    """
+    Deletes files under category_images/ that no category refers to.
+    Returns {"scanned", "orphaned", "deleted", "reclaimed_bytes", "orphans", "errors"};
+    on a dry run reclaimed_bytes is what deleting every orphan would free, otherwise
+    only files actually deleted count, and errors lists (name, error) for the rest.
+    """
+    storage = Category._meta.get_field("image").storage
+    referenced = referenced_media_names()
+    scanned = 0
+    orphans = []
+    for name, size in scan_media(storage, min_age):
+        scanned += 1
+        if name not in referenced:
+            orphans.append((name, size))
+
+    report = {
+        "scanned": scanned,
+        "orphaned": len(orphans),
+        "deleted": 0,
+        "reclaimed_bytes": sum(size for _, size in orphans) if dry_run else 0,
+        "orphans": orphans,
+        "errors": [],
+    }
+    if dry_run or not orphans:
+        return report
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        errors = list(executor.map(lambda orphan: _delete(storage, orphan[0]), orphans))
+    for (name, size), error in zip(orphans, errors):
+        if error is None:
+            report["deleted"] += 1
+            report["reclaimed_bytes"] += size
+        else:
+            report["errors"].append((name, str(error) or type(error).__name__))
+    return report
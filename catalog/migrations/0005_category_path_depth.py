@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_alter_category_options_category_order'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+    ]
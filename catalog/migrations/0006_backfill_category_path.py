@@ -0,0 +1,32 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model("catalog", "Category")
+
+    children = defaultdict(list)
+    for pk, parent_id in Category.objects.values_list("id", "parent_id"):
+        children[parent_id].append(pk)
+
+    updated = []
+    stack = [(pk, "") for pk in children[None]]
+    while stack:
+        pk, parent_path = stack.pop()
+        path = f"{parent_path}{pk}/"
+        updated.append(Category(id=pk, path=path, depth=parent_path.count("/")))
+        stack.extend((child_id, path) for child_id in children[pk])
+
+    Category.objects.bulk_update(updated, ["path", "depth"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_category_path_depth'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_backfill_category_path'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['depth', 'parent', 'order'], name='catalog_cat_depth_0a4939_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 17:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_category_depth_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['parent', 'order', 'id'], name='catalog_cat_parent__1a1266_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_category_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='island_id',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def backfill_islands(apps, schema_editor):
+    Category = apps.get_model("catalog", "Category")
+    SimilarCategory = apps.get_model("catalog", "SimilarCategory")
+
+    parent = {}
+
+    def find(node):
+        parent.setdefault(node, node)
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for a_id, b_id in SimilarCategory.objects.values_list("category_a_id", "category_b_id").iterator():
+        root_a, root_b = find(a_id), find(b_id)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    Category.objects.bulk_update(
+        [Category(id=node, island_id=find(node)) for node in list(parent)],
+        ["island_id"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0009_category_island_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_islands, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0010_backfill_category_island'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('revision', models.CharField(blank=True, max_length=64)),
+                ('file', models.FileField(blank=True, upload_to='graph_reports/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='catalog_gra_status_c181a2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_graphreport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='thumbnail_pending',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
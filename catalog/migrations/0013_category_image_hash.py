@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0012_category_thumbnail_pending'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:29
+
+import catalog.images
+import catalog.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0013_category_image_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, default=catalog.models._get_default_image, null=True, storage=catalog.images.image_storage, upload_to=catalog.images.upload_path, validators=[catalog.models._validate_image_size]),
+        ),
+    ]
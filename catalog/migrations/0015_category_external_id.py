@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0014_category_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='external_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True),
+        ),
+    ]
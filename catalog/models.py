@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import os
-import secrets
 from typing import Optional
 
-from PIL import Image
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+
+from catalog.images import MAX_IMAGE_BYTES, image_storage, store_image_variants, upload_path
+
+PATH_SEPARATOR = "/"
+
+# Columns written by the thumbnail job rather than by saves that leave the image alone
+THUMBNAIL_JOB_FIELDS = ("image", "image_hash", "thumbnail_pending")
 
 
 def _validate_image_size(image):
-    max_size = 1 * 1024 * 1024  # 1MB
-    if image.size > max_size:
+    if image.size > MAX_IMAGE_BYTES:
         raise ValidationError("Image size should not exceed 1MB.")
 
 
@@ -19,32 +25,12 @@ def _get_default_image():
     return "category_images/default.png"  # Place this file under MEDIA_ROOT/category_images/
 
 
-def _create_thumbnail(image_path):
-    size = (100, 100)
-
-    filename = os.path.basename(image_path).lower()
-
-    if filename == "default.png" or "_thumb" in filename:
-        return None  # nothing to change
-
-    rand_suffix = secrets.token_hex(4)
-    base, ext = os.path.splitext(image_path)
-    thumb_path = f"{base}_thumb_{rand_suffix}{ext}"
-
-    os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
-
-    with Image.open(image_path) as img:
-        img.thumbnail(size)
-        img.save(thumb_path)
-
-    return os.path.basename(thumb_path)
-
-
 class Category(models.Model):
     name: str = models.CharField(max_length=255)
     description: str = models.TextField(blank=True)
     image = models.ImageField(
-        upload_to="category_images/uploaded_images/",
+        upload_to=upload_path,
+        storage=image_storage,
         blank=True,
         null=True,
         validators=[_validate_image_size],
@@ -60,61 +46,152 @@ class Category(models.Model):
 
     order = models.PositiveIntegerField(default=0)
 
+    # Key of the category in the files it is bulk-imported from, NULL when created otherwise
+    external_id: Optional[str] = models.CharField(max_length=255, null=True, blank=True, unique=True, editable=False)
+
+    # Materialized path of ancestor ids including self, e.g. "1/5/12/", and the stored depth
+    path: str = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    depth: int = models.PositiveIntegerField(default=0, editable=False)
+
+    # Similarity island label: the id of one member of the island, NULL for a category without links
+    island_id: Optional[int] = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True)
+
+    # Set while the thumbnail of a newly stored image is being generated in the background
+    thumbnail_pending: bool = models.BooleanField(default=False, editable=False)
+    # Content hash naming the image's responsive variants, blank until they are generated
+    image_hash: str = models.CharField(max_length=64, blank=True, editable=False)
+
     def __str__(self):
         return self.name
 
-    def _is_descendant_of(self, target: Category) -> bool:
-        node = target
-        while node:
-            if node.pk == self.pk:
-                return True
-            node = node.parent
-        return False
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "image" in field_names:
+            instance._stored_image = instance.__dict__["image"]
+        return instance
+
+    def _image_changed(self, update_fields) -> bool:
+        """True when this save stores a different image from the one loaded from the database."""
+        if update_fields is not None and "image" not in update_fields:
+            return False
+        if not self.image:
+            return bool(getattr(self, "_stored_image", None))
+        if not self.image._committed or self._state.adding:
+            return True
+        return self.image.name != getattr(self, "_stored_image", self.image.name)
 
     @property
-    def depth(self) -> int:
-        """Calculates the depth of the category in the tree."""
-        depth = 0
-        node = self.parent
-        while node:
-            depth += 1
-            node = node.parent
-        return depth
+    def needs_thumbnail(self) -> bool:
+        return bool(self.image) and os.path.basename(self.image.name).lower() != "default.png"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+    def _is_descendant_of(self, target: Category) -> bool:
+        """Returns True if target is this category or lies in its subtree."""
+        return bool(self.path) and target.path.startswith(self.path)
 
-        if self.image and os.path.exists(self.image.path):
-            filename = os.path.basename(self.image.name).lower()
+    @property
+    def ancestor_ids(self) -> list[int]:
+        return [int(pk) for pk in self.path.split(PATH_SEPARATOR)[:-2]]
+
+    def get_descendants(self, include_self: bool = False):
+        queryset = Category.objects.filter(path__startswith=self.path)
+        if not include_self:
+            queryset = queryset.exclude(pk=self.pk)
+        return queryset
+
+    def _load_paths(self) -> tuple[Optional[str], str]:
+        """Fetches the stored path of this row and of its parent in a single query."""
+        ids = [pk for pk in (self.pk, self.parent_id) if pk is not None]
+        stored = dict(Category.objects.filter(pk__in=ids).values_list("id", "path")) if ids else {}
+        parent_path = stored.get(self.parent_id, "") if self.parent_id is not None else ""
+        return stored.get(self.pk), parent_path
+
+    def _move_descendants(self, old_path: str) -> None:
+        old_depth = old_path.count(PATH_SEPARATOR) - 1
+        Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+            path=Concat(Value(self.path), Substr("path", len(old_path) + 1), output_field=models.CharField()),
+            depth=F("depth") + (self.depth - old_depth),
+        )
 
-            if "_thumb" not in filename and filename != "default.png":
-                thumb_name = _create_thumbnail(self.image.path)
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None and not self._state.adding and not self._image_changed(None):
+            # The thumbnail job owns these columns while the image stays the same; writing
+            # back the values loaded before it finished would undo its result
+            kwargs["update_fields"] = update_fields = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in THUMBNAIL_JOB_FIELDS
+            ]
+        track_path = update_fields is None or "parent" in update_fields
+        created = self.pk is None
+
+        if self.image and not self.image._committed:
+            self._reuse_stored_image()
+
+        # The previous image's variants no longer apply; the thumbnail is generated by the
+        # job thread once a post_save receiver queues it
+        image_changed = self._image_changed(update_fields)
+        self._thumbnail_requested = image_changed and self.needs_thumbnail
+        if image_changed:
+            self.image_hash = ""
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "image_hash"}
+        if self._thumbnail_requested:
+            self.thumbnail_pending = True
+            if update_fields is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "thumbnail_pending"}
+
+        if track_path:
+            old_path, parent_path = self._load_paths()
+            self.depth = parent_path.count(PATH_SEPARATOR)
+            if not created:
+                self.path = f"{parent_path}{self.pk}{PATH_SEPARATOR}"
+            if update_fields is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "path", "depth"}
 
-                if thumb_name:
-                    self.image.name = f"category_images/uploaded_images/{thumb_name}"
-                    super().save(update_fields=["image"])
+        super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        if self.image and os.path.isfile(self.image.path):
-            filename = os.path.basename(self.image.name).lower()
-            if filename != "default.png":
-                os.remove(self.image.path)
-        super().delete(*args, **kwargs)
+        if track_path:
+            if created:
+                self.path = f"{parent_path}{self.pk}{PATH_SEPARATOR}"
+                Category.objects.filter(pk=self.pk).update(path=self.path)
+            elif old_path and old_path != self.path:
+                self._move_descendants(old_path)
+
+        self._stored_image = self.image.name
+
+    def _reuse_stored_image(self) -> None:
+        """Points a new upload at the identical file already in storage instead of storing a copy."""
+        name = self.image.field.generate_filename(self, self.image.name)
+        if self.image.storage.exists(name):
+            self.image.name = name
+            self.image._committed = True
+
+    def generate_thumbnail(self) -> bool:
+        """
+        Points the image at its content-hashed copy and renders the responsive variants,
+        without saving the row. Returns False when the image is missing or the default.
+        """
+        if not self.needs_thumbnail or not self.image.storage.exists(self.image.name):
+            return False
+        self.image.name, self.image_hash = store_image_variants(self.image.storage, self.image.name)
+        return True
 
     def clean(self):
-        if self.parent == self:
+        if self.parent_id is not None and self.parent_id == self.pk:
             raise ValidationError("A category cannot be its own parent.")
 
-        # Check for loops: walk up the parent chain
-        current = self.parent
-        while current is not None:
-            if current == self:
+        # Check for loops: the new parent must not sit inside this category's subtree
+        if self.pk is not None and self.parent_id is not None and self.path:
+            if Category.objects.filter(pk=self.parent_id, path__startswith=self.path).exists():
                 raise ValidationError("A category cannot be moved into its own subtree.")
-            current = current.parent
 
     class Meta:
         indexes = [
             models.Index(fields=["parent"]),
+            models.Index(fields=["depth", "parent", "order"]),
+            models.Index(fields=["parent", "order", "id"]),
         ]
         unique_together = ("name", "parent")
         ordering = ["parent_id", "order"]
@@ -149,3 +226,29 @@ class SimilarCategory(models.Model):
             models.Index(fields=["category_a"]),
             models.Index(fields=["category_b"]),
         ]
+
+
+class GraphReport(models.Model):
+    """A generated similarity graph report, kept as a versioned artifact."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    revision = models.CharField(max_length=64, blank=True)
+    file = models.FileField(upload_to="graph_reports/", blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Graph report #{self.pk} ({self.status})"
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
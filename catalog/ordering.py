@@ -0,0 +1,187 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from catalog.cache import invalidate_catalog
+from catalog.models import PATH_SEPARATOR, Category
+
+
+def move_category(category_id, offset):
+    """
+    Moves a category `offset` positions among its siblings (negative moves it up)
+    and renumbers the sibling list. The category and its siblings are row-locked
+    for the duration, and only rows whose order changed are written, in one bulk UPDATE.
+    Returns True if the order changed.
+    """
+    with transaction.atomic():
+        parent_id = Category.objects.select_for_update().values_list("parent_id", flat=True).get(pk=category_id)
+        siblings = list(
+            Category.objects.select_for_update()
+            .filter(parent_id=parent_id)
+            .order_by("order", "id")
+            .values_list("id", "order")
+        )
+        sibling_ids = [pk for pk, _ in siblings]
+        idx = sibling_ids.index(category_id)
+        new_idx = min(max(idx + offset, 0), len(sibling_ids) - 1)
+        if new_idx == idx:
+            return False
+
+        sibling_ids.insert(new_idx, sibling_ids.pop(idx))
+        current_order = dict(siblings)
+        changed = [
+            Category(id=pk, order=position)
+            for position, pk in enumerate(sibling_ids)
+            if current_order[pk] != position
+        ]
+        Category.objects.bulk_update(changed, ["order"])
+        invalidate_catalog()
+    return True
+
+
+def apply_moves(operations):
+    """
+    Applies a batch of {"id", "parent", "order"} moves in one transaction.
+
+    `order` is a position in the target sibling list, as with move_category: the source
+    and target sibling lists are renumbered so it never collides with a sibling's order.
+
+    Only the moved rows, their target parents, the sibling lists they leave or join and
+    the subtrees under the moved rows' stored paths are locked and loaded. Every operation
+    is validated against those stored paths before anything is written; the changed rows
+    are then written with one bulk UPDATE. Returns the ids of the top-most moved
+    categories, whose subtrees cover everything whose path changed.
+    """
+    moved_ids = {operation["id"] for operation in operations}
+    if len(moved_ids) < len(operations):
+        raise ValidationError("A category can only be moved once per batch.")
+    target_ids = {operation["parent"] for operation in operations if operation.get("parent") is not None}
+    with transaction.atomic():
+        rows = {
+            pk: {"parent_id": parent_id, "order": order, "path": path}
+            for pk, parent_id, order, path in Category.objects.select_for_update()
+            .filter(pk__in=moved_ids | target_ids)
+            .values_list("id", "parent_id", "order", "path")
+        }
+
+        parent_by_id = {}
+        for operation in operations:
+            pk = operation["id"]
+            if pk not in rows:
+                raise ValidationError(f"Category {pk} does not exist.")
+            if "parent" in operation:
+                parent_id = operation["parent"]
+                if parent_id is not None and parent_id not in rows:
+                    raise ValidationError(f"Parent category {parent_id} does not exist.")
+                if parent_id == pk:
+                    raise ValidationError("A category cannot be its own parent.")
+                parent_by_id[pk] = parent_id
+
+        sibling_lists = {parent_by_id.get(pk, rows[pk]["parent_id"]) for pk in moved_ids}
+        sibling_lists.update(rows[pk]["parent_id"] for pk in parent_by_id)
+        siblings = Q(parent_id__in=[parent_id for parent_id in sibling_lists if parent_id is not None])
+        if None in sibling_lists:
+            siblings |= Q(parent__isnull=True)
+        subtrees = Q()
+        for pk in moved_ids:
+            subtrees |= Q(path__startswith=rows[pk]["path"])
+        for pk, parent_id, order, path in (
+            Category.objects.select_for_update()
+            .filter(subtrees | siblings)
+            .values_list("id", "parent_id", "order", "path")
+        ):
+            rows.setdefault(pk, {"parent_id": parent_id, "order": order, "path": path})
+
+        paths = _moved_paths(rows, parent_by_id)
+        order_by_id = _sibling_positions(rows, parent_by_id, operations, sibling_lists)
+        categories = {
+            pk: Category(
+                id=pk,
+                parent_id=parent_by_id.get(pk, row["parent_id"]),
+                order=order_by_id.get(pk, row["order"]),
+                path=paths[pk],
+                depth=paths[pk].count(PATH_SEPARATOR) - 1,
+            )
+            for pk, row in rows.items()
+        }
+        changed = [
+            category
+            for pk, category in categories.items()
+            if (rows[pk]["parent_id"], rows[pk]["order"], rows[pk]["path"])
+            != (category.parent_id, category.order, category.path)
+        ]
+        try:
+            with transaction.atomic():
+                Category.objects.bulk_update(changed, ["parent", "order", "path", "depth"], batch_size=500)
+        except IntegrityError:
+            raise ValidationError("A category with this name already exists under the target parent.")
+        invalidate_catalog()
+
+    return [
+        pk for pk in moved_ids if not any(ancestor in moved_ids for ancestor in categories[pk].ancestor_ids)
+    ]
+
+
+def _moved_paths(rows, parent_by_id):
+    """
+    Computes the new path of every loaded row from the stored paths. A reparented row
+    takes its new parent's new path; any other row keeps the part of its stored path
+    below its nearest reparented ancestor. Reaching a reparented row again while its
+    own path is being resolved means the batch moves it into its own subtree.
+    """
+    paths = {}
+    resolving = set()
+
+    def resolve(pk):
+        if pk in paths:
+            return paths[pk]
+        stored = rows[pk]["path"]
+        if pk in parent_by_id:
+            if pk in resolving:
+                raise ValidationError("A category cannot be moved into its own subtree.")
+            resolving.add(pk)
+            parent_id = parent_by_id[pk]
+            paths[pk] = f"{resolve(parent_id) if parent_id is not None else ''}{pk}{PATH_SEPARATOR}"
+        else:
+            ancestor_ids = Category(path=stored).ancestor_ids
+            moved_ancestor = next((a for a in reversed(ancestor_ids) if a in parent_by_id), None)
+            if moved_ancestor is None:
+                paths[pk] = stored
+            else:
+                paths[pk] = resolve(moved_ancestor) + stored[len(rows[moved_ancestor]["path"]):]
+        return paths[pk]
+
+    for pk in rows:
+        resolve(pk)
+    return paths
+
+
+def _sibling_positions(rows, parent_by_id, operations, sibling_lists):
+    """
+    Renumbers every sibling list a batch touches. Siblings that stay keep their relative
+    order, rows moved in without an `order` join the end, and rows with an `order` are
+    then inserted at that position, in batch order. Returns {id: new order}.
+    """
+    def final_parent(pk):
+        return parent_by_id.get(pk, rows[pk]["parent_id"])
+
+    positioned = [operation for operation in operations if "order" in operation]
+    placed = {operation["id"] for operation in positioned}
+    moved_in = [
+        operation["id"]
+        for operation in operations
+        if operation["id"] not in placed and final_parent(operation["id"]) != rows[operation["id"]]["parent_id"]
+    ]
+
+    joining = set(moved_in)
+    lists = {parent_id: [] for parent_id in sibling_lists}
+    for pk in sorted(rows, key=lambda pk: (rows[pk]["order"], pk)):
+        parent_id = final_parent(pk)
+        if parent_id in lists and pk not in placed and pk not in joining:
+            lists[parent_id].append(pk)
+    for pk in moved_in:
+        lists[final_parent(pk)].append(pk)
+    for operation in positioned:
+        lists[final_parent(operation["id"])].insert(operation["order"], operation["id"])
+
+    return {pk: position for siblings in lists.values() for position, pk in enumerate(siblings)}
@@ -0,0 +1,92 @@
+import base64
+import binascii
+import json
+
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class DepthPagination(LimitOffsetPagination):
+    """Opt-in paging for tree levels: only applied when the client sends ?limit=."""
+
+    default_limit = None
+    max_limit = 1000
+
+
+class CategoryKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (parent_id, order, id). Each page is one index range
+    scan starting after the last row of the previous page, so page N costs the
+    same as page 1. Root categories (parent_id NULL) sort first.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        # MySQL/MariaDB and SQLite already sort NULLs first; only ask for it where the modifier exists
+        nulls_first = True if connection.features.supports_order_by_nulls_modifier else None
+        queryset = queryset.order_by(F("parent_id").asc(nulls_first=nulls_first), "order", "id")
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(*position))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.next_position = (page[-1].parent_id, page[-1].order, page[-1].id) if self.has_next else None
+        return page
+
+    @staticmethod
+    def _after(parent_id, order, pk):
+        same_parent_after = Q(order__gt=order) | Q(order=order, id__gt=pk)
+        if parent_id is None:
+            return Q(parent__isnull=True) & same_parent_after | Q(parent__isnull=False)
+        return Q(parent_id__gt=parent_id) | Q(parent_id=parent_id) & same_parent_after
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            parent_id, order, pk = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            if parent_id is not None:
+                parent_id = int(parent_id)
+            return parent_id, int(order), int(pk)
+        except (binascii.Error, UnicodeError, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(list(position)).encode("ascii")).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class SimilarityCursorPagination(CursorPagination):
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
@@ -1,7 +1,39 @@
-from django.db.models import Q
+from django.conf import settings
 from rest_framework import serializers
 
+from catalog.images import default_variant_url, variant_urls
 from catalog.models import Category, SimilarCategory
+from catalog.similarity import SimilarityIndex
+
+
+def _absolute(url, request):
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def pending_image_url(request=None):
+    """URL of the placeholder served while a category thumbnail is being generated."""
+    return _absolute(Category._meta.get_field("image").storage.url(settings.CATEGORY_IMAGE_PENDING), request)
+
+
+def image_url(category, request=None):
+    """The default variant once variants exist, else the stored image (legacy rows)."""
+    if category.thumbnail_pending:
+        return pending_image_url(request)
+    if category.image_hash:
+        return _absolute(default_variant_url(category.image.storage, category.image_hash), request)
+    if category.image:
+        return _absolute(category.image.url, request)
+    return None
+
+
+def image_variant_urls(category, request=None):
+    """Maps format -> {size: url}, or None until the variants have been generated."""
+    if category.thumbnail_pending or not category.image_hash:
+        return None
+    return {
+        fmt: {size: _absolute(url, request) for size, url in urls.items()}
+        for fmt, urls in variant_urls(category.image.storage, category.image_hash).items()
+    }
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -21,6 +53,8 @@ class CategorySerializer(serializers.ModelSerializer):
         allow_null=True
     )
 
+    image_variants = serializers.SerializerMethodField()
+
     def validate(self, data):
         instance = self.instance or Category(**data)
         for attr, value in data.items():
@@ -29,38 +63,78 @@ class CategorySerializer(serializers.ModelSerializer):
         instance.full_clean()
         return data
 
+    def get_image_variants(self, obj):
+        return image_variant_urls(obj, self.context.get("request"))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.thumbnail_pending or instance.image_hash:
+            data["image"] = image_url(instance, self.context.get("request"))
+        return data
+
     class Meta:
         model = Category
-        fields = ["id", "name", "description", "image", "children", "parent", "similar_to"]
+        fields = ["id", "name", "description", "image", "image_variants", "children", "parent", "similar_to"]
 
 
 class CategoryTreeSerializer(serializers.ModelSerializer):
+    """
+    Nested category tree. A `fields` entry in the context selects a sparse fieldset,
+    applied on every level; `children` is always kept as it carries the nesting.
+    """
+
     children = serializers.SerializerMethodField()
     similar_to = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    # Category columns each optional field reads, so a sparse fieldset can defer the rest
+    FIELD_COLUMNS = {
+        "id": (),
+        "name": ("name",),
+        "description": ("description",),
+        "image": ("image", "image_hash", "thumbnail_pending"),
+        "image_variants": ("image", "image_hash", "thumbnail_pending"),
+        "similar_to": (),
+    }
 
     class Meta:
         model = Category
-        fields = ["id", "name", "description", "image", "children", "similar_to"]
+        fields = ["id", "name", "description", "image", "image_variants", "children", "similar_to"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get("fields")
+        if selected is not None:
+            for name in set(self.fields) - set(selected) - {"children"}:
+                self.fields.pop(name)
+
+    @classmethod
+    def columns_for(cls, fields):
+        return sorted({column for field in fields for column in cls.FIELD_COLUMNS[field]})
 
     def get_children(self, obj):
-        return CategoryTreeSerializer(obj.children.all(), many=True).data
+        tree = self.context.get("tree")
+        children = tree.children_of(obj.id) if tree is not None else obj.children.all()
+        return CategoryTreeSerializer(children, many=True, context=self.context).data
 
     def get_similar_to(self, obj):
-        links = SimilarCategory.objects.filter(
-            Q(category_a=obj) | Q(category_b=obj)
-        )
-        related_ids = {
-            link.category_b.id if link.category_a == obj else link.category_a.id
-            for link in links
-        }
-        names = Category.objects.filter(id__in=related_ids).values_list("name", flat=True)
-        return sorted(names)
+        similarity = self.context.get("similarity")
+        if similarity is None:
+            similarity = SimilarityIndex.load([obj.id])
+        return similarity.similar_names(obj.id)
 
     def get_image(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
+        return image_url(obj)
+
+    def get_image_variants(self, obj):
+        return image_variant_urls(obj)
+
+
+class CategoryMoveSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    parent = serializers.IntegerField(required=False, allow_null=True)
+    order = serializers.IntegerField(required=False, min_value=0)
 
 
 class SimilarCategorySerializer(serializers.ModelSerializer):
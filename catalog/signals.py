@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from catalog.cache import invalidate_catalog, invalidate_similarity
+from catalog.islands import merge_islands, split_island
+from catalog.jobs import queue_thumbnails
+from catalog.media_gc import delete_unreferenced_files
+from catalog.models import Category, SimilarCategory
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SimilarCategory)
+def invalidate_catalog_cache(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver([post_save, post_delete], sender=SimilarCategory)
+def invalidate_similarity_graph(sender, **kwargs):
+    invalidate_similarity()
+
+
+@receiver(post_save, sender=SimilarCategory)
+def merge_similarity_islands(sender, instance, created, **kwargs):
+    if created:
+        merge_islands(instance.category_a_id, instance.category_b_id)
+
+
+@receiver(post_delete, sender=SimilarCategory)
+def split_similarity_island(sender, instance, **kwargs):
+    split_island(instance.category_a_id, instance.category_b_id)
+
+
+@receiver(post_save, sender=Category)
+def queue_category_thumbnail(sender, instance, **kwargs):
+    if getattr(instance, "_thumbnail_requested", False):
+        instance._thumbnail_requested = False
+        queue_thumbnails([instance.pk])
+
+
+@receiver(post_delete, sender=Category)
+def delete_category_files(sender, instance, **kwargs):
+    """Also runs for every row removed by a cascade through the parent FK, which skips Model.delete."""
+    image, image_hash = instance.image.name, instance.image_hash
+    if image or image_hash:
+        transaction.on_commit(lambda: delete_unreferenced_files(image, image_hash))
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+from django.db.models import Q
+
+from catalog.models import SimilarCategory
+
+# Category ids per link query, well below SQLite's limit on bound variables
+LOOKUP_BATCH_SIZE = 500
+
+
+class SimilarityIndex:
+    """
+    Neighbour map (id → similar ids) plus an id → name map, built with at most two
+    queries and shared by everything that decorates categories with their similarities.
+    """
+
+    def __init__(self, links, names):
+        self._neighbours = defaultdict(set)
+        for a_id, b_id in links:
+            self._neighbours[a_id].add(b_id)
+            self._neighbours[b_id].add(a_id)
+        self._names = names
+
+    @classmethod
+    def load(cls, category_ids=None, names=None):
+        """
+        Loads the links touching category_ids (all links when None), with the names of
+        both ends read through the same query. The ids are looked up in batches, each
+        an indexed lookup on category_a and category_b that stays below SQLite's limit
+        on bound variables. Names already known to the caller are passed in.
+        """
+        rows = SimilarCategory.objects.values_list(
+            "category_a_id", "category_b_id", "category_a__name", "category_b__name"
+        )
+        if category_ids is None:
+            batches = [rows]
+        else:
+            category_ids = sorted(set(category_ids))
+            batches = [
+                rows.filter(Q(category_a_id__in=batch) | Q(category_b_id__in=batch))
+                for batch in (
+                    category_ids[start:start + LOOKUP_BATCH_SIZE]
+                    for start in range(0, len(category_ids), LOOKUP_BATCH_SIZE)
+                )
+            ]
+
+        links = set()
+        names = dict(names or {})
+        for batch in batches:
+            for a_id, b_id, a_name, b_name in batch:
+                links.add((a_id, b_id))
+                names[a_id] = a_name
+                names[b_id] = b_name
+        return cls(links, names)
+
+    def neighbours(self, category_id):
+        return self._neighbours.get(category_id, set())
+
+    def similar_names(self, category_id):
+        return sorted(
+            self._names[other_id]
+            for other_id in self.neighbours(category_id)
+            if other_id in self._names
+        )
@@ -0,0 +1,114 @@
+import csv
+import json
+
+from django.db import transaction
+
+from catalog.cache import invalidate_catalog, invalidate_similarity
+from catalog.islands import rebuild_islands
+from catalog.models import Category, SimilarCategory
+
+IMPORT_BATCH_SIZE = 5000
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def _decoded(lines):
+    for line in lines:
+        yield line.decode("utf-8") if isinstance(line, bytes) else line
+
+
+def parse_csv_pairs(lines):
+    """
+    Yields (a, b) for every `a,b` row, or None for a row that is not a pair of ids.
+    A non-numeric first row of two columns is taken as a header and skipped.
+    """
+    for line_number, row in enumerate(csv.reader(_decoded(lines))):
+        if not row:
+            continue
+        if len(row) != 2:
+            yield None
+            continue
+        try:
+            yield int(row[0]), int(row[1])
+        except ValueError:
+            if line_number > 0:
+                yield None
+
+
+def parse_ndjson_pairs(lines):
+    """
+    Yields (a, b) for every `{"category_a": a, "category_b": b}` or `[a, b]` line,
+    or None for a line that is not a pair of ids.
+    """
+    for line in _decoded(lines):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                item = item["category_a"], item["category_b"]
+            a, b = item
+            yield int(a), int(b)
+        except (ValueError, TypeError, KeyError):
+            yield None
+
+
+def parse_pairs(lines, input_format):
+    if input_format == "csv":
+        return parse_csv_pairs(lines)
+    if input_format == "ndjson":
+        return parse_ndjson_pairs(lines)
+    raise ValueError(f"Unknown import format: {input_format}")
+
+
+def import_similarities(pairs, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Inserts similarity links from an iterable of (a, b) pairs, None marking an unparsable one.
+
+    Pairs are normalized to (min, max) and checked against one read of the category ids
+    and one of the existing links, so the database only sees the batched inserts. Bulk
+    inserts skip the model signals, so the island index is rebuilt afterwards.
+
+    Returns counts of inserted, duplicate (already stored or repeated in the input) and
+    invalid (unparsable, self-referencing or unknown ids) pairs.
+    """
+    counts = {"inserted": 0, "duplicate": 0, "invalid": 0}
+    category_ids = set(Category.objects.values_list("id", flat=True).iterator())
+
+    new_pairs = set()
+    for pair in pairs:
+        if pair is None:
+            counts["invalid"] += 1
+            continue
+        a, b = min(pair), max(pair)
+        if a == b or a not in category_ids or b not in category_ids:
+            counts["invalid"] += 1
+        elif (a, b) in new_pairs:
+            counts["duplicate"] += 1
+        else:
+            new_pairs.add((a, b))
+
+    existing = SimilarCategory.objects.values_list("category_a_id", "category_b_id")
+    for pair in existing.iterator(chunk_size=batch_size):
+        if pair in new_pairs:
+            new_pairs.discard(pair)
+            counts["duplicate"] += 1
+
+    if not new_pairs:
+        return counts
+
+    with transaction.atomic():
+        # ignore_conflicts covers links written concurrently since the read above; those
+        # rows are not inserted here, so the count comes from the table, not new_pairs
+        stored_before = SimilarCategory.objects.count()
+        SimilarCategory.objects.bulk_create(
+            (SimilarCategory(category_a_id=a, category_b_id=b) for a, b in sorted(new_pairs)),
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        counts["inserted"] = SimilarCategory.objects.count() - stored_before
+        counts["duplicate"] += len(new_pairs) - counts["inserted"]
+        rebuild_islands(batch_size=batch_size)
+        invalidate_catalog()
+        invalidate_similarity()
+    return counts
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+from django.core.cache import cache
+
+TEST_IMAGES = Path(__file__).parent / "test-images"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    # Tests run in one process, so a private in-memory cache keeps them apart from the shared one
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def sample_image():
+    """Path of a small JPEG photo."""
+    return TEST_IMAGES / "fruits.jpeg"
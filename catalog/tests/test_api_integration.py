@@ -1,9 +1,7 @@
-from pathlib import Path
-
 import pytest
 from rest_framework.test import APIClient
 
-from catalog.models import Category
+from catalog.models import Category, SimilarCategory
 
 
 @pytest.mark.django_db
@@ -16,8 +14,8 @@ class TestCategoryAPI:
         Category.objects.create(name="B", description="B")
         response = self.client.get("/api/categories/")
         assert response.status_code == 200
-        assert isinstance(response.json(), list)
-        assert len(response.json()) >= 2
+        assert isinstance(response.json()["results"], list)
+        assert len(response.json()["results"]) >= 2
 
     def test_category_tree(self):
         root = Category.objects.create(name="Parent", description="Root")
@@ -33,10 +31,9 @@ class TestCategoryAPI:
         assert response.status_code == 200
         assert response.json()["id"] == root.id
 
-    def test_create_and_patch_category(self):
+    def test_create_and_patch_category(self, media_root, sample_image):
         root = Category.objects.create(name="Parent", description="Root")
-        img_path = Path(__file__).parent / "test-images" / "fruits.jpeg"
-        with open(img_path, "rb") as img:
+        with open(sample_image, "rb") as img:
             response = self.client.post("/api/categories/", {
                 "name": "TestCategory",
                 "description": "Test Desc",
@@ -114,6 +111,25 @@ class TestCategoryAPI:
         assert response.status_code == 400
         assert "Invalid depth" in response.data["detail"]
 
+    def test_get_categories_by_depth_range_paginated(self):
+        root = Category.objects.create(name="Root")
+        child1 = Category.objects.create(name="Child1", parent=root, order=0)
+        Category.objects.create(name="Child2", parent=root, order=1)
+        Category.objects.create(name="Grandchild1", parent=child1)
+
+        response = self.client.get("/api/categories/by_depth/?depth_range=1-2")
+        assert response.status_code == 200
+        assert [cat["name"] for cat in response.data] == ["Child1", "Child2", "Grandchild1"]
+
+        response = self.client.get("/api/categories/by_depth/?depth_range=1-2&limit=2&offset=1")
+        assert response.status_code == 200
+        assert response.data["count"] == 3
+        assert [cat["name"] for cat in response.data["results"]] == ["Child2", "Grandchild1"]
+
+        response = self.client.get("/api/categories/by_depth/?depth_range=2-1")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Depth range start must not exceed its end"
+
 
 @pytest.mark.django_db
 class TestCategoryReordering:
@@ -153,6 +169,16 @@ class TestCategoryReordering:
         assert resp.status_code == 200
         assert self.get_ordered_names() == ["A", "B", "C"]
 
+    def test_move_query_count_independent_of_sibling_count(self, django_assert_max_num_queries):
+        for i in range(50):
+            Category.objects.create(name=f"X{i}", parent=self.parent, order=3 + i)
+
+        url = f"/api/categories/{self.cat_a.id}/move-down/?steps=40"
+        with django_assert_max_num_queries(8):
+            resp = self.client.post(url)
+        assert resp.status_code == 200
+        assert self.get_ordered_names().index("A") == 40
+
 
 @pytest.mark.django_db
 class TestCategoryConstraints:
@@ -202,7 +228,7 @@ class TestRetrievalOptions:
         child = Category.objects.create(name="C", description="Y", parent=parent)
         response = self.client.get("/api/categories/", {"parent": parent.id})
         assert response.status_code == 200
-        assert all(c["parent"] == parent.id for c in response.json())
+        assert all(c["parent"] == parent.id for c in response.json()["results"])
 
     def test_by_depth(self):
         root = Category.objects.create(name="R", description="Z")
@@ -210,7 +236,7 @@ class TestRetrievalOptions:
         leaf = Category.objects.create(name="L", description="X", parent=mid)
         response = self.client.get("/api/categories/?depth=2")
         assert response.status_code == 200
-        ids = [c["id"] for c in response.json()]
+        ids = [c["id"] for c in response.json()["results"]]
         assert leaf.id in ids
 
 
@@ -239,3 +265,123 @@ class TestSimilarityRules:
             "category_b": a.id
         }, format="json")
         assert resp.status_code in (200, 201)
+
+
+@pytest.mark.django_db
+class TestBulkMove:
+    def setup_method(self):
+        self.client = APIClient()
+        self.a = Category.objects.create(name="A")
+        self.b = Category.objects.create(name="B")
+        self.a1 = Category.objects.create(name="A1", parent=self.a, order=0)
+        self.a2 = Category.objects.create(name="A2", parent=self.a, order=1)
+        self.a11 = Category.objects.create(name="A11", parent=self.a1)
+
+    def test_reparent_and_reorder(self):
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": self.a1.id, "parent": self.b.id, "order": 0},
+            {"id": self.a2.id, "order": 5},
+        ], format="json")
+        assert response.status_code == 200
+        assert {node["name"] for node in response.json()} == {"A1", "A2"}
+        moved = next(node for node in response.json() if node["name"] == "A1")
+        assert moved["children"][0]["name"] == "A11"
+
+        self.a11.refresh_from_db()
+        assert self.a11.path == f"{self.b.id}/{self.a1.id}/{self.a11.id}/"
+        assert self.a11.depth == 2
+        self.a2.refresh_from_db()
+        assert self.a2.order == 0
+
+    def test_cycle_is_rejected_without_writes(self):
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": self.a2.id, "parent": self.b.id},
+            {"id": self.a.id, "parent": self.a11.id},
+        ], format="json")
+        assert response.status_code == 400
+        self.a2.refresh_from_db()
+        assert self.a2.parent_id == self.a.id
+
+    def test_moves_nested_in_one_batch_use_the_new_parent_paths(self):
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": self.a11.id, "parent": self.a2.id},
+            {"id": self.a.id, "parent": self.b.id},
+        ], format="json")
+        assert response.status_code == 200
+        assert [node["name"] for node in response.json()] == ["A"]
+
+        self.a11.refresh_from_db()
+        assert self.a11.path == f"{self.b.id}/{self.a.id}/{self.a2.id}/{self.a11.id}/"
+        assert self.a11.depth == 3
+        self.a1.refresh_from_db()
+        assert self.a1.path == f"{self.b.id}/{self.a.id}/{self.a1.id}/"
+
+    def test_order_is_a_position_among_the_siblings(self):
+        a3 = Category.objects.create(name="A3", parent=self.a, order=2)
+        response = self.client.post("/api/categories/bulk-move/", [{"id": a3.id, "order": 0}], format="json")
+        assert response.status_code == 200
+        assert list(self.a.children.order_by("order").values_list("name", "order")) == [
+            ("A3", 0), ("A1", 1), ("A2", 2)
+        ]
+
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": self.a1.id, "parent": self.b.id, "order": 0},
+            {"id": a3.id, "parent": self.b.id, "order": 0},
+        ], format="json")
+        assert response.status_code == 200
+        assert list(self.b.children.order_by("order").values_list("name", "order")) == [("A3", 0), ("A1", 1)]
+        assert list(self.a.children.values_list("name", "order")) == [("A2", 0)]
+
+    def test_duplicate_ids_are_rejected(self):
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": self.a1.id, "order": 0},
+            {"id": self.a1.id, "parent": self.b.id},
+        ], format="json")
+        assert response.status_code == 400
+        self.a1.refresh_from_db()
+        assert self.a1.parent_id == self.a.id
+
+    def test_unknown_category_is_rejected(self):
+        response = self.client.post("/api/categories/bulk-move/", [
+            {"id": 999999, "parent": None},
+        ], format="json")
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestPagination:
+    def setup_method(self):
+        self.client = APIClient()
+
+    def collect(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == 200
+            names.extend(item["name"] for item in response.json()["results"])
+            url = response.json()["next"]
+        return names
+
+    def test_category_keyset_pages_cover_all_rows_in_order(self):
+        roots = [Category.objects.create(name=f"Root{i}", order=i) for i in range(3)]
+        for root in roots:
+            for i in range(3):
+                Category.objects.create(name=f"{root.name}-{i}", parent=root, order=2 - i)
+
+        expected = list(
+            Category.objects.order_by("parent_id", "order", "id").values_list("name", flat=True)
+        )
+        assert self.collect("/api/categories/?page_size=2") == expected
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/categories/?cursor=not-a-cursor")
+        assert response.status_code == 404
+
+    def test_similarities_are_cursor_paginated(self):
+        categories = [Category.objects.create(name=f"C{i}") for i in range(4)]
+        for other in categories[1:]:
+            SimilarCategory.objects.create(category_a=categories[0], category_b=other)
+
+        response = self.client.get("/api/similarities/?page_size=2")
+        assert len(response.json()["results"]) == 2
+        assert response.json()["next"] is not None
@@ -1,5 +1,9 @@
+from io import StringIO
+
 import pytest
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from catalog.models import Category
 
@@ -13,3 +17,64 @@ def test_category_depth():
     assert root.depth == 0
     assert child.depth == 1
     assert grandchild.depth == 2
+
+
+@pytest.mark.django_db
+def test_category_path_follows_reparent():
+    root = Category.objects.create(name="Root")
+    other = Category.objects.create(name="Other")
+    child = Category.objects.create(name="Child", parent=root)
+    grandchild = Category.objects.create(name="Grandchild", parent=child)
+
+    assert grandchild.path == f"{root.id}/{child.id}/{grandchild.id}/"
+    assert list(root.get_descendants()) == [child, grandchild]
+
+    child.parent = other
+    child.save()
+    grandchild.refresh_from_db()
+
+    assert grandchild.path == f"{other.id}/{child.id}/{grandchild.id}/"
+    assert grandchild.depth == 2
+    assert grandchild.ancestor_ids == [other.id, child.id]
+    assert not root.get_descendants().exists()
+
+
+@pytest.mark.django_db
+def test_category_cannot_move_into_own_subtree():
+    root = Category.objects.create(name="Root")
+    child = Category.objects.create(name="Child", parent=root)
+
+    root.parent = child
+    with pytest.raises(ValidationError):
+        root.full_clean()
+
+
+@pytest.mark.django_db
+def test_rebuild_category_paths_command():
+    root = Category.objects.create(name="Root")
+    child = Category.objects.create(name="Child", parent=root)
+    Category.objects.filter(pk=child.pk).update(path="", depth=0)
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_category_paths", "--verify", stdout=StringIO())
+
+    call_command("rebuild_category_paths", stdout=StringIO())
+    child.refresh_from_db()
+    assert child.path == f"{root.id}/{child.id}/"
+    assert child.depth == 1
+    call_command("rebuild_category_paths", "--verify", stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_admin_move_buttons_post_to_the_move_views(admin_client):
+    first = Category.objects.create(name="First", order=0)
+    second = Category.objects.create(name="Second", order=1)
+
+    changelist = admin_client.get("/admin/catalog/category/").content.decode()
+    assert f'formmethod="post" formaction="/admin/catalog/category/{second.pk}/move-up/"' in changelist
+    assert 'name="csrfmiddlewaretoken"' in changelist
+
+    assert admin_client.get(f"/admin/catalog/category/{second.pk}/move-up/").status_code == 405
+    assert admin_client.post(f"/admin/catalog/category/{second.pk}/move-up/").status_code == 302
+    assert list(Category.objects.order_by("order").values_list("id", flat=True)) == [second.pk, first.pk]
+    assert admin_client.post("/admin/catalog/category/999999/move-up/").status_code == 404
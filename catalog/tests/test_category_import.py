@@ -0,0 +1,107 @@
+import json
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from catalog.category_import import import_categories
+from catalog.jobs import run_thumbnails
+from catalog.models import Category
+from catalog.tree import find_path_mismatches
+
+RECORDS = [
+    {"external_id": "apple", "name": "Apples", "parent": "fruit", "order": 1},
+    {"external_id": "fruit", "name": "Fruit", "parent": None},
+    {"external_id": "green", "name": "Green apples", "parent": "apple"},
+    {"external_id": "pear", "name": "Pears", "parent": "fruit", "order": 0},
+    {"external_id": "veg", "name": "Vegetables", "description": "Fresh"},
+]
+
+
+@pytest.mark.django_db
+def test_import_builds_tree_level_by_level(django_assert_max_num_queries):
+    with django_assert_max_num_queries(9):
+        ids = import_categories(RECORDS)["ids"]
+
+    green = Category.objects.get(pk=ids["green"])
+    assert green.parent_id == ids["apple"]
+    assert green.depth == 2
+    assert green.ancestor_ids == [ids["fruit"], ids["apple"]]
+    assert Category.objects.get(pk=ids["veg"]).description == "Fresh"
+    assert find_path_mismatches() == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("records, message", [
+    ([{"external_id": "a", "name": "A"}, {"external_id": "a", "name": "B"}], "Duplicate external_id"),
+    ([{"external_id": "a", "name": "A", "parent": "missing"}], "unknown parent"),
+    ([{"external_id": "a", "name": "A", "parent": "b"}, {"external_id": "b", "name": "B", "parent": "a"}], "cycle"),
+    ([{"external_id": "a", "name": "A"}, {"external_id": "b", "name": "A"}], "duplicate name"),
+    ([{"name": "A"}], "external_id is required"),
+    ([{"external_id": "a", "name": "A", "image": "../settings.py"}], "relative path"),
+    ([{"external_id": "a", "name": "A", "image": "/etc/passwd"}], "relative path"),
+    ([{"external_id": "a", "name": "A", "image": "category_images/missing.jpeg"}], "not found"),
+])
+def test_import_rejects_invalid_files(records, message):
+    with pytest.raises(ValidationError) as exc:
+        import_categories(records)
+    assert message in " ".join(exc.value.messages)
+    assert not Category.objects.exists()
+
+
+@pytest.mark.django_db
+def test_reimport_updates_and_moves_by_external_id():
+    ids = import_categories(RECORDS)["ids"]
+    report = import_categories([
+        {"external_id": "apple", "name": "Apples", "parent": "veg", "description": "Moved"},
+        {"external_id": "red", "name": "Red apples", "parent": "apple"},
+    ])
+    assert (report["created"], report["updated"]) == (1, 1)
+    assert report["ids"]["apple"] == ids["apple"]
+    assert Category.objects.count() == len(RECORDS) + 1
+
+    green = Category.objects.get(pk=ids["green"])
+    assert green.ancestor_ids == [ids["veg"], ids["apple"]]
+    assert Category.objects.get(pk=ids["apple"]).description == "Moved"
+    assert Category.objects.get(pk=report["ids"]["red"]).depth == 2
+    assert find_path_mismatches() == []
+
+
+@pytest.mark.django_db
+def test_import_defers_thumbnails(media_root, sample_image, django_capture_on_commit_callbacks):
+    (media_root / "category_images").mkdir()
+    shutil.copy(sample_image, media_root / "category_images" / "fruits.jpeg")
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        ids = import_categories([{"external_id": "f", "name": "Fruit", "image": "category_images/fruits.jpeg"}])["ids"]
+    assert Category.objects.get(pk=ids["f"]).image.name == "category_images/fruits.jpeg"
+    assert len(callbacks) >= 1
+
+    run_thumbnails([ids["f"]])
+    assert Category.objects.get(pk=ids["f"]).image_hash
+
+
+@pytest.mark.django_db
+def test_import_endpoint_and_command(tmp_path):
+    client = APIClient()
+    response = client.post("/api/categories/import/", RECORDS, format="json")
+    assert response.status_code == 201
+    assert response.json()["created"] == 5
+    response = client.post("/api/categories/import/", RECORDS[:1], format="json")
+    assert response.status_code == 200
+    assert response.json()["updated"] == 1
+
+    path = tmp_path / "categories.csv"
+    path.write_text("external_id,name,parent\nroot,Bakery,\nbread,Bread,root\n")
+    out = StringIO()
+    call_command("import_categories", str(path), stdout=out)
+    assert "Imported 2 new and updated 0 existing categories" in out.getvalue()
+    assert Category.objects.get(name="Bread").parent.name == "Bakery"
+
+    path = tmp_path / "categories.json"
+    path.write_text(json.dumps([{"external_id": "x", "name": "X", "parent": "x"}]))
+    with pytest.raises(Exception, match="cycle"):
+        call_command("import_categories", str(path))
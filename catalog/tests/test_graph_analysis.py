@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from catalog.graph_analysis import (
+    SimilarityGraph,
+    _bfs_levels,
+    build_similarity_graph,
+    compute_island_diameters,
+    find_diameter_of_island,
+    find_rabbit_islands,
+)
+from catalog.models import Category, SimilarCategory
+
+
+def make_graph(edges):
+    return SimilarityGraph.from_edges(set(edges))
+
+
+def eccentricity(graph, node_id):
+    if node_id not in graph:
+        return 0
+    return len(_bfs_levels(graph, graph.index_of(node_id))[1]) - 1
+
+
+def assert_is_shortest_path(graph, path):
+    for a, b in zip(path, path[1:]):
+        assert b in graph[a]
+    last_level = _bfs_levels(graph, graph.index_of(path[0]))[1][len(path) - 1]
+    assert graph.index_of(path[-1]) in last_level
+
+
+def test_diameter_of_chain():
+    graph = make_graph([(i, i + 1) for i in range(1, 200)])
+    path = find_diameter_of_island(graph, set(range(1, 201)))
+    assert sorted([path[0], path[-1]]) == [1, 200]
+    assert len(path) == 200
+
+
+def test_diameter_of_singleton_island():
+    assert find_diameter_of_island(make_graph([]), {7}) == []
+
+
+def test_csr_graph_neighbours():
+    graph = make_graph([(10, 20), (10, 30), (30, 40)])
+    assert len(graph) == 4
+    assert sorted(graph.get(10)) == [20, 30]
+    assert graph.get(99) == ()
+    assert 40 in graph and 50 not in graph
+
+
+@pytest.mark.django_db
+def test_build_similarity_graph_and_islands():
+    a, b, c, d = (Category.objects.create(name=name) for name in "ABCD")
+    SimilarCategory.objects.create(category_a=a, category_b=b)
+    SimilarCategory.objects.create(category_a=b, category_b=c)
+
+    graph = build_similarity_graph()
+    islands = find_rabbit_islands(graph, [a.id, b.id, c.id, d.id])
+    assert islands == [{a.id, b.id, c.id}, {d.id}]
+
+
+def test_exact_diameter_matches_all_pairs_bfs_on_random_graphs():
+    rng = random.Random(42)
+    for _ in range(30):
+        nodes = list(range(1, 40))
+        edges = [tuple(sorted(rng.sample(nodes, 2))) for _ in range(45)]
+        graph = make_graph(edges)
+        for island in find_rabbit_islands(graph, nodes):
+            expected = max(eccentricity(graph, node) for node in island)
+            path = find_diameter_of_island(graph, island)
+            assert max(len(path) - 1, 0) == expected
+            if path:
+                assert_is_shortest_path(graph, path)
+
+
+def test_approximate_diameter_is_a_lower_bound():
+    graph = make_graph([(1, 2), (2, 3), (3, 4), (4, 1), (4, 5)])
+    approximate = find_diameter_of_island(graph, {1, 2, 3, 4, 5}, approximate=True)
+    exact = find_diameter_of_island(graph, {1, 2, 3, 4, 5})
+    assert len(approximate) <= len(exact) == 4
+
+
+def test_parallel_island_diameters_match_serial():
+    rng = random.Random(7)
+    nodes = list(range(1, 300))
+    graph = make_graph([tuple(sorted(rng.sample(nodes, 2))) for _ in range(250)])
+    islands = find_rabbit_islands(graph, nodes)
+
+    serial = compute_island_diameters(graph, islands)
+    assert compute_island_diameters(graph, islands, workers=3) == serial
+    assert [len(path) for path in serial] == [len(find_diameter_of_island(graph, island)) for island in islands]
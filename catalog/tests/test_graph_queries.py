@@ -0,0 +1,95 @@
+import random
+
+import pytest
+from rest_framework.test import APIClient
+
+from catalog import cache
+from catalog.graph_analysis import SimilarityGraph, k_hop_neighbourhood, shortest_path
+from catalog.models import Category, SimilarCategory
+
+
+def bfs_distance(edges, a, b):
+    adjacency = {}
+    for x, y in edges:
+        adjacency.setdefault(x, set()).add(y)
+        adjacency.setdefault(y, set()).add(x)
+    seen, frontier, distance = {a}, [a], 0
+    while frontier:
+        if b in frontier:
+            return distance
+        frontier = [n for node in frontier for n in adjacency.get(node, ()) if n not in seen]
+        seen.update(frontier)
+        distance += 1
+    return None
+
+
+def test_shortest_path_matches_plain_bfs():
+    rng = random.Random(7)
+    edges = {tuple(sorted(rng.sample(range(1, 200), 2))) for _ in range(300)}
+    graph = SimilarityGraph.from_edges(edges)
+    linked = {pair[0] for pair in edges} | {pair[1] for pair in edges}
+    adjacency = set(edges)
+    for _ in range(50):
+        a, b = rng.sample(sorted(linked), 2)
+        path = shortest_path(graph, a, b)
+        expected = bfs_distance(edges, a, b)
+        if expected is None:
+            assert path is None
+            continue
+        assert path[0] == a and path[-1] == b
+        assert len(path) - 1 == expected
+        assert all(tuple(sorted(pair)) in adjacency for pair in zip(path, path[1:]))
+
+
+def test_k_hop_neighbourhood():
+    graph = SimilarityGraph.from_edges([(1, 2), (2, 3), (3, 4), (1, 5)])
+    assert k_hop_neighbourhood(graph, 1, 1) == [(2, 1), (5, 1)]
+    assert k_hop_neighbourhood(graph, 1, 2) == [(2, 1), (5, 1), (3, 2)]
+    assert k_hop_neighbourhood(graph, 1, 3, limit=2) == [(2, 1), (5, 1)]
+    assert k_hop_neighbourhood(graph, 9, 2) == []
+
+
+@pytest.fixture
+def chain(db):
+    categories = [Category.objects.create(name=f"C{i}") for i in range(5)]
+    for a, b in zip(categories, categories[1:]):
+        SimilarCategory.objects.create(category_a=a, category_b=b)
+    return categories
+
+
+def test_similar_endpoint(chain):
+    client = APIClient()
+    response = client.get(f"/api/categories/{chain[0].id}/similar/", {"hops": 2})
+    assert response.status_code == 200
+    assert response.json() == [
+        {"id": chain[1].id, "name": "C1", "distance": 1},
+        {"id": chain[2].id, "name": "C2", "distance": 2},
+    ]
+    assert client.get(f"/api/categories/{chain[0].id}/similar/", {"hops": 9}).status_code == 400
+    assert client.get("/api/categories/999999/similar/").status_code == 404
+    assert client.get("/api/categories/abc/similar/").status_code == 404
+
+
+def test_path_endpoint(chain):
+    client = APIClient()
+    response = client.get("/api/similarities/path/", {"from": chain[0].id, "to": chain[3].id})
+    assert response.status_code == 200
+    assert response.json()["length"] == 3
+    assert [node["name"] for node in response.json()["path"]] == ["C0", "C1", "C2", "C3"]
+
+    lonely = Category.objects.create(name="Lonely")
+    assert client.get("/api/similarities/path/", {"from": chain[0].id, "to": lonely.id}).status_code == 404
+    assert client.get("/api/similarities/path/", {"from": "x", "to": 1}).status_code == 400
+
+
+def test_graph_is_cached_until_similarity_changes(chain, django_assert_num_queries):
+    cache.get_similarity_graph()
+    with django_assert_num_queries(0):
+        cache.get_similarity_graph()
+
+    Category.objects.create(name="Unlinked")
+    with django_assert_num_queries(0):
+        cache.get_similarity_graph()
+
+    SimilarCategory.objects.get(category_a=chain[1], category_b=chain[2]).delete()
+    assert shortest_path(cache.get_similarity_graph(), chain[0].id, chain[4].id) is None
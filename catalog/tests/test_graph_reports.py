@@ -0,0 +1,104 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from catalog.graph_analysis import export_graph_analysis_to_json, format_category_path, graph_revision
+from catalog.jobs import latest_graph_report, request_graph_report, run_graph_report
+from catalog.models import Category, GraphReport, SimilarCategory
+
+
+@pytest.fixture
+def linked_categories(db):
+    a = Category.objects.create(name="A")
+    b = Category.objects.create(name="B")
+    SimilarCategory.objects.create(category_a=a, category_b=b)
+    return a, b
+
+
+def test_request_graph_report_reuses_active_job(linked_categories):
+    first = request_graph_report()
+    assert first.status == GraphReport.Status.PENDING
+    assert request_graph_report() == first
+
+
+def test_request_graph_report_expires_lost_job(linked_categories, settings):
+    settings.GRAPH_REPORT_TIMEOUT = 60
+    lost = request_graph_report()
+    GraphReport.objects.filter(pk=lost.pk).update(
+        status=GraphReport.Status.RUNNING, created_at=timezone.now() - timedelta(minutes=5)
+    )
+
+    job = request_graph_report()
+    assert job != lost
+    assert job.status == GraphReport.Status.PENDING
+    lost.refresh_from_db()
+    assert lost.status == GraphReport.Status.FAILED
+    assert lost.finished_at is not None
+
+
+def test_graph_revision_changes_on_rename(linked_categories):
+    a, _ = linked_categories
+    revision = graph_revision()
+    a.name = "Renamed"
+    a.save()
+    assert graph_revision() != revision
+
+
+def test_run_graph_report_stores_versioned_artifact(linked_categories, media_root):
+    job = request_graph_report()
+    run_graph_report(job.pk)
+
+    job.refresh_from_db()
+    assert job.status == GraphReport.Status.DONE
+    assert job.revision
+    assert job.file.name.startswith("graph_reports/graph_report_")
+    assert latest_graph_report() == job
+    with job.file.open("rb") as f:
+        assert json.load(f)["longest_rabbit_hole"]["length"] == 1
+
+
+def test_admin_report_view_serves_latest_and_queues_when_missing(admin_client, linked_categories, media_root):
+    response = admin_client.get("/admin/export-graph-report/")
+    assert response.status_code == 202
+
+    run_graph_report(GraphReport.objects.get().pk)
+    response = admin_client.get("/admin/export-graph-report/?download=1")
+    assert response.status_code == 200
+    assert "attachment" in response["Content-Disposition"]
+    assert json.loads(b"".join(response.streaming_content))["rabbit_islands"]
+
+    status = admin_client.get("/admin/export-graph-report/status/").json()
+    assert status["latest_finished"]["status"] == "done"
+    assert admin_client.post("/admin/export-graph-report/regenerate/").status_code == 202
+
+
+@pytest.mark.parametrize("indent", [2, None])
+def test_streamed_report_matches_json_dump(linked_categories, tmp_path, indent):
+    Category.objects.create(name="Lonely")
+    path, summary = export_graph_analysis_to_json(str(tmp_path / "report.json"), indent=indent)
+    text = open(path, encoding="utf-8").read()
+    report = json.loads(text)
+
+    assert summary["rabbit_islands"] == len(report["rabbit_islands"]) == 2
+    separators = None if indent else (",", ":")
+    assert text == json.dumps(report, indent=indent, ensure_ascii=False, separators=separators) + "\n"
+
+
+def test_gzip_ndjson_report(linked_categories, tmp_path):
+    path, _ = export_graph_analysis_to_json(str(tmp_path / "report.ndjson.gz"), compress=True, output_format="ndjson")
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["longest_rabbit_hole"]["length"] == 1
+    assert [sorted(c["name"] for c in line["rabbit_island"]) for line in lines[1:]] == [["A", "B"]]
+
+
+def test_format_category_path_uses_preloaded_names(linked_categories, django_assert_num_queries):
+    a, b = linked_categories
+    with django_assert_num_queries(0):
+        assert format_category_path([a.id, 0], {a.id: "A"}) == [
+            {"id": a.id, "name": "A"},
+            {"id": 0, "name": "[Unknown:0]"},
+        ]
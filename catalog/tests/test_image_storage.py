@@ -0,0 +1,82 @@
+import pytest
+from django.core.files.storage import InMemoryStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from catalog.jobs import run_thumbnails
+from catalog.media_gc import collect_garbage
+from catalog.models import Category
+
+class CountingStorage(InMemoryStorage):
+    """Non-filesystem stand-in for object storage that records every metadata lookup."""
+
+    def __init__(self, **kwargs):
+        super().__init__(base_url="https://cdn.example.com/media/", **kwargs)
+        self.lookups = 0
+
+    def exists(self, name):
+        self.lookups += 1
+        return super().exists(name)
+
+    def size(self, name):
+        self.lookups += 1
+        return super().size(name)
+
+
+@pytest.fixture
+def storage(monkeypatch, settings):
+    settings.CATEGORY_IMAGE_VARIANT_SIZES = [100, 48]
+    storage = CountingStorage()
+    monkeypatch.setattr(Category._meta.get_field("image"), "storage", storage)
+    return storage
+
+
+@pytest.fixture
+def upload(sample_image):
+    def upload(name):
+        image = SimpleUploadedFile(f"{name}.jpeg", sample_image.read_bytes(), content_type="image/jpeg")
+        response = APIClient().post("/api/categories/", {"name": name, "parent": "", "image": image}, format="multipart")
+        assert response.status_code == 201
+        return Category.objects.get(pk=response.json()["id"])
+    return upload
+
+
+@pytest.mark.django_db
+def test_identical_uploads_share_one_sharded_file(storage, upload):
+    first, second = upload("First"), upload("Second")
+    assert first.image.name == second.image.name
+    shard = first.image.name.split("/")[2:4]
+    assert all(len(part) == 2 for part in shard)
+    assert storage.listdir("/".join(first.image.name.split("/")[:-1]))[1] == [first.image.name.split("/")[-1]]
+
+    run_thumbnails([first.pk, second.pk])
+    first.refresh_from_db()
+    assert first.image_hash.startswith("".join(shard))
+
+
+@pytest.mark.django_db
+def test_serializing_needs_no_storage_lookups(storage, upload):
+    category = upload("Fruit")
+    run_thumbnails([category.pk])
+    for i in range(20):
+        Category.objects.create(name=f"Child {i}", parent=category, image=category.image.name)
+
+    storage.lookups = 0
+    client = APIClient()
+    tree = client.get("/api/categories/tree/").json()
+    flat = client.get("/api/categories/", {"parent": category.pk}).json()["results"]
+    assert tree[0]["image"].startswith("https://cdn.example.com/media/category_images/variants/")
+    assert len(flat) == 20
+    assert storage.lookups == 0
+
+
+@pytest.mark.django_db
+def test_gc_media_walks_object_storage(storage, upload):
+    category = upload("Fruit")
+    run_thumbnails([category.pk])
+    orphan = storage.save("category_images/originals/ff/ff/orphan.jpeg", SimpleUploadedFile("x", b"x" * 64))
+
+    report = collect_garbage(min_age=0)
+    assert report["orphans"] == [(orphan, 64)]
+    assert not storage.exists(orphan)
+    assert storage.exists(category.image.name)
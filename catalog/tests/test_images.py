@@ -0,0 +1,50 @@
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from catalog.images import render_variants, store_image_variants, variant_name
+
+@pytest.fixture
+def storage(tmp_path):
+    return FileSystemStorage(location=tmp_path, base_url="/media/")
+
+
+def test_render_variants_fit_every_size_from_one_decode(sample_image):
+    data = sample_image.read_bytes()
+    variants = list(render_variants(data, [640, 320, 100, 48], ["webp", "jpeg"]))
+    assert [(size, fmt) for size, fmt, _ in variants] == [
+        (size, fmt) for size in (640, 320, 100, 48) for fmt in ("webp", "jpeg")
+    ]
+    with Image.open(sample_image) as original:
+        original_size = original.size
+    for size, fmt, encoded in variants:
+        with Image.open(BytesIO(encoded)) as img:
+            assert img.format == fmt.upper()
+            assert max(img.size) == min(size, max(original_size))
+
+
+def test_render_variants_keep_transparency_in_webp_only():
+    buffer = BytesIO()
+    Image.new("RGBA", (400, 200), (255, 0, 0, 128)).save(buffer, "PNG")
+    variants = {(size, fmt): encoded for size, fmt, encoded in render_variants(buffer.getvalue(), [100], ["webp", "jpeg"])}
+    assert Image.open(BytesIO(variants[100, "webp"])).mode == "RGBA"
+    assert Image.open(BytesIO(variants[100, "jpeg"])).size == (100, 50)
+
+
+def test_identical_uploads_are_stored_once(storage, settings, sample_image):
+    settings.CATEGORY_IMAGE_VARIANT_SIZES = [100, 48]
+    data = sample_image.read_bytes()
+    first = storage.save("category_images/a.jpeg", ContentFile(data))
+    second = storage.save("category_images/b.jpeg", ContentFile(data))
+
+    name, image_hash = store_image_variants(storage, first)
+    assert store_image_variants(storage, second) == (name, image_hash)
+    assert name == f"category_images/originals/{image_hash[:2]}/{image_hash[2:4]}/{image_hash}.jpeg"
+
+    variants = sorted(str(path.relative_to(storage.location)) for path in Path(storage.location).rglob("*_*.*"))
+    assert variants == sorted(variant_name(image_hash, size, fmt) for size in (100, 48) for fmt in ("webp", "jpeg"))
+    assert variants[0].startswith(f"category_images/variants/{image_hash[:2]}/{image_hash[2:4]}/")
@@ -0,0 +1,72 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from catalog.graph_analysis import build_similarity_graph, find_rabbit_islands
+from catalog.islands import island_of, load_islands
+from catalog.models import Category, SimilarCategory
+
+
+def indexed_islands():
+    return sorted(sorted(island) for island in load_islands().values())
+
+
+def computed_islands():
+    ids = Category.objects.values_list("id", flat=True)
+    return sorted(sorted(island) for island in find_rabbit_islands(build_similarity_graph(), ids))
+
+
+@pytest.fixture
+def chain(db):
+    categories = [Category.objects.create(name=f"C{i}") for i in range(5)]
+    for a, b in zip(categories, categories[1:]):
+        SimilarCategory.objects.create(category_a=a, category_b=b)
+    return categories
+
+
+def test_links_merge_islands(chain):
+    assert island_of(chain[0].id) == island_of(chain[4].id)
+    assert indexed_islands() == computed_islands()
+
+
+def test_deleting_a_link_splits_the_island(chain):
+    SimilarCategory.objects.get(category_a=chain[1], category_b=chain[2]).delete()
+    assert island_of(chain[0].id) == island_of(chain[1].id)
+    assert island_of(chain[2].id) == island_of(chain[4].id)
+    assert island_of(chain[0].id) != island_of(chain[4].id)
+    assert indexed_islands() == computed_islands()
+
+    SimilarCategory.objects.get(category_a=chain[0], category_b=chain[1]).delete()
+    assert island_of(chain[0].id) == chain[0].id
+    assert indexed_islands() == computed_islands()
+
+
+def test_split_relabels_large_components_in_batches(chain, monkeypatch):
+    monkeypatch.setattr("catalog.islands.RELABEL_BATCH_SIZE", 2)
+    link = SimilarCategory.objects.get(category_a=chain[0], category_b=chain[1])
+    link.delete()
+    assert island_of(chain[0].id) == chain[0].id
+    assert island_of(chain[1].id) == island_of(chain[4].id) == chain[1].id
+    assert indexed_islands() == computed_islands()
+
+
+def test_deleting_a_category_updates_islands(chain):
+    chain[2].delete()
+    assert indexed_islands() == computed_islands()
+
+
+def test_rebuild_islands_command(chain):
+    Category.objects.update(island_id=None)
+    call_command("rebuild_islands", stdout=StringIO())
+    assert indexed_islands() == computed_islands()
+
+
+def test_island_endpoints(chain):
+    client = APIClient()
+    response = client.get(f"/api/categories/{chain[0].id}/island/")
+    assert response.json()["categories"] == [c.id for c in chain]
+
+    response = client.get("/api/similarities/islands/")
+    assert [island["size"] for island in response.json()] == [5]
@@ -0,0 +1,99 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from catalog.images import original_name, variant_name
+from catalog.media_gc import collect_garbage
+from catalog.models import Category
+
+HASH = "ab" * 16
+
+
+@pytest.fixture
+def media_root(media_root, settings):
+    settings.CATEGORY_IMAGE_VARIANT_SIZES = [48]
+    settings.CATEGORY_IMAGE_VARIANT_FORMATS = ["jpeg"]
+    return media_root
+
+
+def write(root, name, size=10):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_gc_media_deletes_only_unreferenced_files(db, media_root):
+    kept = [
+        write(media_root, "category_images/default.png"),
+        write(media_root, "category_images/pending.png"),
+        write(media_root, original_name(HASH, ".jpeg")),
+        write(media_root, variant_name(HASH, 48, "jpeg")),
+        write(media_root, "graph_reports/report.json"),
+    ]
+    orphans = [
+        write(media_root, "category_images/originals/replaced.jpeg", 100),
+        write(media_root, variant_name("cd" * 16, 48, "jpeg"), 50),
+    ]
+    category = Category.objects.create(name="Kept")
+    Category.objects.filter(pk=category.pk).update(image=original_name(HASH, ".jpeg"), image_hash=HASH)
+
+    out = StringIO()
+    call_command("gc_media", "--dry-run", "--min-age=0", stdout=out)
+    assert "Would delete 2 of 6 files" in out.getvalue()
+    assert all(path.exists() for path in orphans)
+
+    report = collect_garbage(min_age=0, workers=2)
+    assert report["deleted"] == 2
+    assert report["reclaimed_bytes"] == 150
+    assert not any(path.exists() for path in orphans)
+    assert all(path.exists() for path in kept)
+
+
+def test_gc_media_reports_failed_deletions(db, media_root, monkeypatch):
+    stuck = write(media_root, "category_images/originals/stuck.jpeg", 100)
+    write(media_root, "category_images/originals/gone.jpeg", 40)
+    storage = Category._meta.get_field("image").storage
+    delete = storage.delete
+
+    def failing_delete(name):
+        if name.endswith("stuck.jpeg"):
+            raise PermissionError("read-only")
+        delete(name)
+
+    monkeypatch.setattr(storage, "delete", failing_delete)
+    report = collect_garbage(min_age=0)
+    assert (report["orphaned"], report["deleted"], report["reclaimed_bytes"]) == (2, 1, 40)
+    assert report["errors"] == [("category_images/originals/stuck.jpeg", "read-only")]
+    assert stuck.exists()
+
+
+def test_gc_media_skips_recent_files(db, media_root):
+    orphan = write(media_root, "category_images/originals/in_flight.jpeg")
+    assert collect_garbage()["scanned"] == 0
+    assert orphan.exists()
+
+
+def test_cascaded_delete_removes_unshared_files(db, media_root, django_capture_on_commit_callbacks):
+    shared = write(media_root, original_name(HASH, ".jpeg"))
+    variant = write(media_root, variant_name(HASH, 48, "jpeg"))
+    own = write(media_root, "category_images/originals/own.jpeg")
+
+    root = Category.objects.create(name="Root")
+    child = Category.objects.create(name="Child", parent=root)
+    grandchild = Category.objects.create(name="Grandchild", parent=child)
+    other = Category.objects.create(name="Other")
+    Category.objects.filter(pk__in=[child.pk, other.pk]).update(image=shared.relative_to(media_root), image_hash=HASH)
+    Category.objects.filter(pk=grandchild.pk).update(image=own.relative_to(media_root))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        root.delete()
+    assert not own.exists()
+    assert shared.exists() and variant.exists()
+
+    other.refresh_from_db()
+    with django_capture_on_commit_callbacks(execute=True):
+        other.delete()
+    assert not shared.exists() and not variant.exists()
+    assert (media_root / "category_images").exists()
@@ -22,7 +22,7 @@ def get_test_image():
 
 
 @pytest.mark.django_db
-def test_category_serializer_create():
+def test_category_serializer_create(media_root):
     data = {
         "name": "Books",
         "description": "All books",
@@ -2,6 +2,7 @@ import pytest
 from django.core.exceptions import ValidationError
 
 from catalog.models import Category, SimilarCategory
+from catalog.similarity import SimilarityIndex
 
 
 @pytest.mark.django_db
@@ -40,3 +41,17 @@ def test_duplicate_similarity_blocked():
 
     with pytest.raises(Exception):  # IntegrityError or ValidationError depending on DB/backend
         SimilarCategory.objects.create(category_a=b, category_b=a)
+
+
+@pytest.mark.django_db
+def test_similarity_index_loads_ids_in_batches(monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr("catalog.similarity.LOOKUP_BATCH_SIZE", 2)
+    categories = [Category.objects.create(name=f"C{i}") for i in range(5)]
+    SimilarCategory.objects.create(category_a=categories[0], category_b=categories[3])
+    SimilarCategory.objects.create(category_a=categories[1], category_b=categories[4])
+
+    with django_assert_num_queries(2):
+        index = SimilarityIndex.load([category.id for category in categories[:4]])
+    assert index.similar_names(categories[0].id) == ["C3"]
+    assert index.similar_names(categories[3].id) == ["C0"]
+    assert index.similar_names(categories[1].id) == ["C4"]
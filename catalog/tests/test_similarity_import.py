@@ -0,0 +1,79 @@
+from io import StringIO
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from rest_framework.test import APIClient
+
+from catalog.islands import island_of
+from catalog.models import Category, SimilarCategory
+from catalog.similarity_import import import_similarities, parse_pairs
+
+
+@pytest.fixture
+def categories(db):
+    categories = [Category.objects.create(name=f"C{i}") for i in range(4)]
+    SimilarCategory.objects.create(category_a=categories[0], category_b=categories[1])
+    return [category.id for category in categories]
+
+
+def stored_pairs():
+    return set(SimilarCategory.objects.values_list("category_a_id", "category_b_id"))
+
+
+def test_import_normalizes_dedupes_and_counts(categories, django_assert_max_num_queries):
+    c0, c1, c2, c3 = categories
+    pairs = [(c1, c0), (c2, c1), (c1, c2), (c3, c2), (c3, c3), (c0, 999999), None]
+    with django_assert_max_num_queries(12):
+        counts = import_similarities(pairs)
+
+    assert counts == {"inserted": 2, "duplicate": 2, "invalid": 3}
+    assert stored_pairs() == {(c0, c1), (c1, c2), (c2, c3)}
+    assert island_of(c0) == island_of(c3)
+
+
+def test_links_written_concurrently_count_as_duplicates(categories, monkeypatch):
+    c0, c1, c2, c3 = categories
+
+    def racing_atomic():
+        # Another writer stores one of the pairs after the existing links were read
+        SimilarCategory.objects.create(category_a_id=c1, category_b_id=c2)
+        return transaction.atomic()
+
+    monkeypatch.setattr("catalog.similarity_import.transaction", SimpleNamespace(atomic=racing_atomic))
+    assert import_similarities([(c1, c2), (c2, c3)]) == {"inserted": 1, "duplicate": 1, "invalid": 0}
+    assert stored_pairs() == {(c0, c1), (c1, c2), (c2, c3)}
+
+
+def test_parse_pairs():
+    assert list(parse_pairs(["a,b\n", "1,2\n", "x,3\n", "\n"], "csv")) == [(1, 2), None]
+    assert list(parse_pairs(["1,2,3\n", "4,5\n"], "csv")) == [None, (4, 5)]
+    lines = ['{"category_a": 1, "category_b": 2}\n', "[3, 4]\n", "{}\n", "oops\n"]
+    assert list(parse_pairs(lines, "ndjson")) == [(1, 2), (3, 4), None, None]
+
+
+def test_import_endpoint(categories):
+    c0, c1, c2, c3 = categories
+    client = APIClient()
+    body = f"category_a,category_b\n{c2},{c3}\n{c0},{c1}\n"
+    response = client.post("/api/similarities/import/", body, content_type="text/csv")
+    assert response.status_code == 200
+    assert response.json() == {"inserted": 1, "duplicate": 1, "invalid": 0}
+
+    body = f'{{"category_a": {c1}, "category_b": {c2}}}\n'
+    response = client.post("/api/similarities/import/", body, content_type="application/x-ndjson")
+    assert response.json()["inserted"] == 1
+    assert client.get("/api/similarities/path/", {"from": c0, "to": c3}).json()["length"] == 3
+
+    assert client.post("/api/similarities/import/", "", content_type="text/plain").status_code == 415
+
+
+def test_import_similarities_command(categories, tmp_path):
+    c0, c1, c2, c3 = categories
+    path = tmp_path / "pairs.ndjson"
+    path.write_text(f"[{c3}, {c0}]\n[{c1}, {c0}]\n")
+    out = StringIO()
+    call_command("import_similarities", str(path), stdout=out)
+    assert "Imported 1 similarities (1 duplicate, 0 invalid)" in out.getvalue()
+    assert (c0, c3) in stored_pairs()
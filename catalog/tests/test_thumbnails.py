@@ -0,0 +1,103 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from catalog.images import original_name, variant_name
+from catalog.jobs import run_thumbnails, thumbnail_metrics
+from catalog.models import Category
+
+@pytest.fixture
+def uploaded(db, media_root, sample_image, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks, open(sample_image, "rb") as img:
+        response = APIClient().post("/api/categories/", {"name": "Fruit", "parent": "", "image": img}, format="multipart")
+    assert response.status_code == 201
+    return response, callbacks
+
+
+def test_upload_serves_placeholder_until_thumbnail_is_ready(uploaded):
+    response, _ = uploaded
+    category = Category.objects.get(pk=response.json()["id"])
+    assert category.thumbnail_pending
+    assert "_thumb" not in category.image.name
+    assert response.json()["image"].endswith("/media/category_images/pending.png")
+    assert APIClient().get("/api/categories/tree/").json()[0]["image"] == "/media/category_images/pending.png"
+
+    run_thumbnails([category.pk])
+    category.refresh_from_db()
+    assert not category.thumbnail_pending
+    assert category.image.name == original_name(category.image_hash, ".jpeg")
+    node = APIClient().get("/api/categories/tree/").json()[0]
+    assert node["image"] == "/media/" + variant_name(category.image_hash, 100, "jpeg")
+    assert node["image_variants"]["webp"]["640"] == "/media/" + variant_name(category.image_hash, 640, "webp")
+
+
+def test_thumbnail_is_queued_only_when_the_image_changes(uploaded, django_capture_on_commit_callbacks):
+    response, callbacks = uploaded
+    queued = sum(callback.__qualname__.startswith("queue_thumbnails") for callback in callbacks)
+    assert queued == 1
+
+    category = Category.objects.get(pk=response.json()["id"])
+    with django_capture_on_commit_callbacks() as callbacks:
+        APIClient().patch(f"/api/categories/{category.pk}/", {"name": "Fresh fruit"}, format="json")
+        category.description = "Updated"
+        category.save()
+    assert not any(callback.__qualname__.startswith("queue_thumbnails") for callback in callbacks)
+
+
+def test_saving_other_fields_keeps_the_finished_thumbnail(uploaded):
+    response, _ = uploaded
+    category = Category.objects.get(pk=response.json()["id"])
+    run_thumbnails([category.pk])
+
+    category.description = "Loaded before the job finished"
+    category.save()
+    APIClient().patch(f"/api/categories/{category.pk}/", {"name": "Fresh fruit"}, format="json")
+
+    category.refresh_from_db()
+    assert not category.thumbnail_pending
+    assert category.image_hash
+    assert category.image.name == original_name(category.image_hash, ".jpeg")
+    assert category.description == "Loaded before the job finished"
+
+
+@pytest.mark.parametrize("replacement", [None, "category_images/default.png"])
+def test_removing_the_image_drops_its_variants(uploaded, replacement):
+    response, _ = uploaded
+    run_thumbnails([response.json()["id"]])
+    category = Category.objects.get(pk=response.json()["id"])
+    assert category.image_hash
+
+    category.image = replacement
+    category.save(update_fields=["image"])
+    category.refresh_from_db()
+    assert category.image_hash == ""
+    assert not category.thumbnail_pending
+    node = APIClient().get(f"/api/categories/{category.pk}/").json()
+    assert node["image_variants"] is None
+    assert node["image"] == (replacement and "http://testserver/media/" + replacement)
+
+
+def test_thumbnail_metrics_and_pending_command(uploaded):
+    assert thumbnail_metrics()["pending"] == 1
+    out = StringIO()
+    call_command("process_pending_thumbnails", stdout=out)
+    assert "Processed 1 pending thumbnails" in out.getvalue()
+
+    metrics = thumbnail_metrics()
+    assert metrics["pending"] == 0
+    assert metrics["processed"] >= 1
+    assert metrics["avg_processing_ms"] is not None
+
+
+def test_missing_variants_are_backfilled(db, media_root, sample_image):
+    (media_root / "category_images").mkdir()
+    (media_root / "category_images" / "legacy.jpeg").write_bytes(sample_image.read_bytes())
+    category = Category.objects.create(name="Legacy")
+    Category.objects.filter(pk=category.pk).update(image="category_images/legacy.jpeg")
+
+    call_command("process_pending_thumbnails", "--missing", stdout=StringIO())
+    category.refresh_from_db()
+    assert category.image_hash
+    assert (media_root / variant_name(category.image_hash, 48, "webp")).exists()
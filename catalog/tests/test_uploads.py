@@ -0,0 +1,65 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from catalog.uploads import sniff_image, upload_metrics
+
+def upload(data, name="upload.jpeg"):
+    image = SimpleUploadedFile(name, data, content_type="image/jpeg")
+    return APIClient().post("/api/categories/", {"name": "Upload", "parent": "", "image": image}, format="multipart")
+
+
+def rejections(reason):
+    return upload_metrics().get(f"rejected_{reason}", 0)
+
+
+def test_sniff_reads_only_the_header(sample_image):
+    data = sample_image.read_bytes()
+    with Image.open(sample_image) as img:
+        expected = ("JPEG", img.size)
+    assert sniff_image(data[:2048]) == expected
+    assert sniff_image(data[:4]) is None
+    assert sniff_image(b"not an image at all") is None
+
+
+@pytest.mark.django_db
+def test_oversized_upload_is_rejected_while_streaming(media_root, sample_image):
+    before = rejections("size")
+    response = upload(sample_image.read_bytes() + b"\0" * (1024 * 1024))
+    assert response.status_code == 400
+    assert response.json() == {"image": ["Image size should not exceed 1MB."]}
+    assert rejections("size") == before + 1
+    assert not Category.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+@pytest.mark.parametrize("side", [5000, 9000])
+def test_decompression_bomb_is_rejected_from_its_header(media_root, side):
+    buffer = BytesIO()
+    Image.new("1", (side, side)).save(buffer, "PNG")
+    assert len(buffer.getvalue()) < 1024 * 1024
+
+    before = rejections("pixels")
+    response = upload(buffer.getvalue(), "bomb.png")
+    assert response.status_code == 400
+    assert "pixel" in response.json()["image"][0]
+    assert rejections("pixels") == before + 1
+
+
+@pytest.mark.django_db
+def test_non_image_upload_is_rejected(media_root):
+    before = rejections("format")
+    assert upload(b"%PDF-1.4 " * 100, "doc.jpeg").status_code == 400
+    assert rejections("format") == before + 1
+
+
+@pytest.mark.django_db
+def test_valid_upload_is_accepted(media_root, sample_image):
+    before = upload_metrics().get("accepted", 0)
+    assert upload(sample_image.read_bytes()).status_code == 201
+    assert upload_metrics()["accepted"] == before + 1
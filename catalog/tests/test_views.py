@@ -1,7 +1,13 @@
+import json
+from io import StringIO
+
 import pytest
+from django.core.management import call_command
 from rest_framework.test import APIClient
 
+from catalog.cache import get_tree_bytes
 from catalog.models import Category, SimilarCategory
+from catalog.serializers import CategoryTreeSerializer
 
 
 @pytest.fixture
@@ -63,3 +69,145 @@ def test_similarity_api(client, setup_categories):
     )
 
 
+def test_category_tree_matches_per_node_serialization(client, setup_categories):
+    laptops = Category.objects.get(name="Laptops")
+    phones = Category.objects.get(name="Phones")
+    SimilarCategory.objects.create(category_a=laptops, category_b=phones)
+
+    expected = CategoryTreeSerializer(Category.objects.filter(parent__isnull=True), many=True).data
+    response = client.get("/api/categories/tree/")
+    assert response.json() == expected
+
+
+def test_category_tree_query_count_is_constant(client, setup_categories, django_assert_num_queries):
+    parent = Category.objects.get(name="Smartphones")
+    for i in range(20):
+        Category.objects.create(name=f"Model {i}", parent=parent, order=20 - i)
+
+    with django_assert_num_queries(2):
+        response = client.get("/api/categories/tree/")
+    assert response.status_code == 200
+
+
+def test_category_subtree_similarity_query_count(client, setup_categories, django_assert_max_num_queries):
+    laptops = Category.objects.get(name="Laptops")
+    for i in range(10):
+        other = Category.objects.create(name=f"Other {i}")
+        SimilarCategory.objects.create(category_a=laptops, category_b=other)
+
+    with django_assert_max_num_queries(6):
+        response = client.get(f"/api/categories/{laptops.id}/subtree/")
+    assert response.json()["similar_to"] == sorted(f"Other {i}" for i in range(10))
+
+
+def test_category_subtree_depth_limit_and_sparse_fields(client, setup_categories, django_assert_num_queries):
+    Category.objects.create(name="Folding Phones", parent=Category.objects.get(name="Smartphones"))
+
+    with django_assert_num_queries(2):
+        response = client.get(f"/api/categories/{setup_categories.id}/subtree/", {"max_depth": 1, "fields": "id,name"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "id": setup_categories.id,
+        "name": "Electronics",
+        "children": [
+            {"id": child.id, "name": child.name, "children": []}
+            for child in Category.objects.filter(parent=setup_categories).order_by("order", "id")
+        ],
+    }
+
+    full = client.get(f"/api/categories/{setup_categories.id}/subtree/", {"max_depth": 2}).json()
+    smartphones = full["children"][1]["children"][0]
+    assert smartphones["name"] == "Smartphones"
+    assert smartphones["children"] == []
+    assert set(smartphones) == {"id", "name", "description", "image", "image_variants", "children", "similar_to"}
+
+
+def test_category_subtree_sparse_fields_defer_columns(client, setup_categories, django_assert_num_queries):
+    with django_assert_num_queries(2) as captured:
+        client.get(f"/api/categories/{setup_categories.id}/subtree/", {"fields": "name"})
+    assert "description" not in captured.captured_queries[-1]["sql"]
+
+
+@pytest.mark.parametrize("params", [{"max_depth": "-1"}, {"max_depth": "x"}, {"fields": "id,price"}])
+def test_category_subtree_rejects_bad_params(client, setup_categories, params):
+    assert client.get(f"/api/categories/{setup_categories.id}/subtree/", params).status_code == 400
+
+
+def test_category_subtree_cache_is_keyed_by_params(client, setup_categories, django_assert_num_queries):
+    url = f"/api/categories/{setup_categories.id}/subtree/"
+    shallow = client.get(url, {"max_depth": 0, "fields": "name"}).json()
+    with django_assert_num_queries(0):
+        assert client.get(url, {"max_depth": 0, "fields": "name"}).json() == shallow
+    assert client.get(url, {"max_depth": 1, "fields": "name"}).json()["children"]
+    assert shallow == {"name": "Electronics", "children": []}
+
+
+def test_category_tree_is_served_from_cache_until_catalog_changes(client, setup_categories, django_assert_num_queries):
+    client.get("/api/categories/tree/")
+    with django_assert_num_queries(0):
+        cached = client.get("/api/categories/tree/")
+    assert cached.json()[0]["name"] == "Electronics"
+
+    Category.objects.create(name="Books")
+    response = client.get("/api/categories/tree/")
+    assert {node["name"] for node in response.json()} == {"Electronics", "Books"}
+
+
+def test_category_subtree_missing_returns_404(client, db):
+    assert client.get("/api/categories/999999/subtree/").status_code == 404
+
+
+def test_warm_category_cache_command(setup_categories, django_assert_num_queries):
+    call_command("warm_category_cache", "--subtrees", stdout=StringIO())
+    with django_assert_num_queries(0):
+        get_tree_bytes()
+
+
+@pytest.mark.parametrize("url", ["/api/categories/", "/api/categories/tree/", "/api/similarities/"])
+def test_read_endpoints_answer_conditional_get(client, setup_categories, url, django_assert_num_queries):
+    response = client.get(url)
+    etag = response["ETag"]
+    assert etag.startswith('"')
+
+    with django_assert_num_queries(0):
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+
+    Category.objects.create(name="Books")
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_etags_differ_between_resources_and_pages(client, setup_categories):
+    root = Category.objects.filter(parent=None).first()
+    urls = [
+        "/api/categories/",
+        "/api/categories/?parent=" + str(root.id),
+        "/api/categories/tree/",
+        f"/api/categories/{root.id}/",
+        f"/api/categories/{root.id}/subtree/",
+        f"/api/categories/{root.id}/subtree/?max_depth=0",
+    ]
+    etags = [client.get(url)["ETag"] for url in urls]
+    assert len(set(etags)) == len(urls)
+
+    response = client.get(f"/api/categories/{root.id}/", HTTP_IF_NONE_MATCH=etags[-1])
+    assert response.status_code == 200
+
+
+def test_category_export_streams_tree_identical_to_tree_endpoint(client, setup_categories):
+    response = client.get("/api/categories/export/")
+    assert response.streaming
+    streamed = json.loads(b"".join(response.streaming_content))
+    assert streamed == client.get("/api/categories/tree/").json()
+
+
+def test_category_export_flat_ndjson(client, setup_categories):
+    response = client.get("/api/categories/export/?shape=flat&output=ndjson")
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert {row["name"] for row in rows} == set(Category.objects.values_list("name", flat=True))
+    assert all(set(row) == {"id", "name", "description", "image", "parent", "order", "depth"} for row in rows)
+
+
+def test_category_export_rejects_unknown_shape(client, db):
+    assert client.get("/api/categories/export/?shape=graph").status_code == 400
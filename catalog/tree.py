@@ -0,0 +1,108 @@
+from collections import defaultdict
+
+from django.db.models import Q
+
+from catalog.models import PATH_SEPARATOR, Category, SimilarCategory
+from catalog.similarity import SimilarityIndex
+
+
+class CategoryTree:
+    """
+    In-memory category tree assembled from one bulk read of categories and
+    one of similarity links, so serializing it costs a constant number of queries.
+    """
+
+    def __init__(self, categories, similarity):
+        self.nodes = {category.id: category for category in categories}
+        self._children = defaultdict(list)
+        for category in self.nodes.values():
+            self._children[category.parent_id].append(category)
+        for siblings in self._children.values():
+            siblings.sort(key=lambda c: (c.order, c.id))
+        self.similarity = similarity
+
+    @classmethod
+    def load(cls):
+        categories = list(Category.objects.all())
+        links = SimilarCategory.objects.values_list("category_a_id", "category_b_id")
+        return cls(categories, SimilarityIndex(links, {category.id: category.name for category in categories}))
+
+    @classmethod
+    def load_subtrees(cls, root_ids, max_depth=None, columns=None, with_similarity=True):
+        """
+        Loads only the subtrees rooted at root_ids, plus their similarity links and the
+        names of the categories on both ends.
+
+        Each subtree is one range scan over the stored materialized path, bounded by the
+        stored depth when max_depth (levels below the root) is given, so no recursive
+        query is needed. `columns` limits the category columns fetched beyond those the
+        tree itself needs.
+        """
+        roots = Category.objects.filter(pk__in=root_ids).values_list("path", "depth")
+        condition = Q(pk__in=[])
+        for path, depth in roots:
+            subtree = Q(path__startswith=path)
+            if max_depth is not None:
+                subtree &= Q(depth__lte=depth + max_depth)
+            condition |= subtree
+
+        categories = Category.objects.filter(condition)
+        if columns is not None:
+            categories = categories.only("id", "parent", "order", *columns)
+        categories = list(categories)
+
+        if not with_similarity:
+            return cls(categories, SimilarityIndex([], {}))
+        return cls(categories, SimilarityIndex.load([category.id for category in categories]))
+
+    @property
+    def context(self):
+        """Serializer context for CategoryTreeSerializer."""
+        return {"tree": self, "similarity": self.similarity}
+
+    def roots(self):
+        return self._children.get(None, [])
+
+    def children_of(self, category_id):
+        return self._children.get(category_id, [])
+
+
+def compute_paths(parent_by_id):
+    """
+    Computes the materialized path of every category reachable from a root.
+    Rows caught in a parent cycle are unreachable and left out of the result.
+    """
+    children = defaultdict(list)
+    for pk, parent_id in parent_by_id.items():
+        children[parent_id].append(pk)
+
+    paths = {}
+    stack = [(pk, "") for pk in children[None]]
+    while stack:
+        pk, parent_path = stack.pop()
+        paths[pk] = f"{parent_path}{pk}{PATH_SEPARATOR}"
+        stack.extend((child_id, paths[pk]) for child_id in children[pk])
+    return paths
+
+
+def find_path_mismatches():
+    """Returns (id, stored_path, expected_path) for every row whose stored encoding is stale."""
+    rows = list(Category.objects.values_list("id", "parent_id", "path", "depth"))
+    expected = compute_paths({pk: parent_id for pk, parent_id, _, _ in rows})
+    mismatches = []
+    for pk, _, path, depth in rows:
+        expected_path = expected.get(pk)
+        if expected_path is None or path != expected_path or depth != expected_path.count(PATH_SEPARATOR) - 1:
+            mismatches.append((pk, path, expected_path))
+    return mismatches
+
+
+def rebuild_paths(batch_size=1000):
+    """Rewrites path and depth of every stale row. Returns the number of rows fixed."""
+    mismatches = [(pk, expected) for pk, _, expected in find_path_mismatches() if expected is not None]
+    Category.objects.bulk_update(
+        [Category(id=pk, path=path, depth=path.count(PATH_SEPARATOR) - 1) for pk, path in mismatches],
+        ["path", "depth"],
+        batch_size=batch_size,
+    )
+    return len(mismatches)
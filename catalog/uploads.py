@@ -0,0 +1,97 @@
+"""
+Upload handler that vets category images while they stream in, before Django has
+buffered the whole file or Pillow has decoded any of it.
+"""
+import threading
+from collections import Counter
+from io import BytesIO
+
+from PIL import Image, UnidentifiedImageError
+from django.core.files.uploadhandler import FileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from catalog.images import ALLOWED_FORMATS, MAX_IMAGE_BYTES, max_image_pixels
+
+# How much of the file may be buffered to identify it; JPEG EXIF blocks can precede the frame header
+SNIFF_LIMIT = 256 * 1024
+
+_stats_lock = threading.Lock()
+# Per-process counts of accepted uploads and of rejections by reason
+upload_stats = Counter()
+
+
+def upload_metrics():
+    with _stats_lock:
+        return dict(upload_stats)
+
+
+def sniff_image(head):
+    """
+    Returns (format, (width, height)) read from the header bytes of an image, or None
+    while the header is still incomplete. Image.open is lazy: it parses the header only,
+    though it already raises DecompressionBombError for far too many pixels.
+    """
+    try:
+        with Image.open(BytesIO(head), formats=ALLOWED_FORMATS) as img:
+            return img.format, img.size
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        return None
+
+
+class CategoryImageUploadHandler(FileUploadHandler):
+    """
+    Watches the `image` file field: rejects it once it passes MAX_IMAGE_BYTES, or as soon
+    as its header shows a disallowed format or more than the allowed pixels. Chunks are
+    passed through unchanged to the handlers that actually store the file.
+    """
+
+    field_name = "image"
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == self.field_name
+        self.received = 0
+        self.head = bytearray()
+        self.identified = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        self.received += len(raw_data)
+        if self.received > MAX_IMAGE_BYTES:
+            self._reject("size", "Image size should not exceed 1MB.")
+        if not self.identified:
+            self.head += raw_data
+            self._check_header(final=len(self.head) >= SNIFF_LIMIT)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.active:
+            if not self.identified:
+                self._check_header(final=True)
+            with _stats_lock:
+                upload_stats["accepted"] += 1
+        return None
+
+    def _check_header(self, final):
+        try:
+            sniffed = sniff_image(bytes(self.head))
+        except Image.DecompressionBombError:
+            self._reject("pixels", "Image dimensions exceed the allowed pixel count.")
+        if sniffed is None:
+            if final:
+                self._reject("format", "Upload a valid image. Supported formats: " + ", ".join(ALLOWED_FORMATS) + ".")
+            return
+
+        _, (width, height) = sniffed
+        self.identified = True
+        self.head = bytearray()
+        if width * height > max_image_pixels():
+            self._reject("pixels", f"Image dimensions {width}x{height} exceed the allowed pixel count.")
+
+    def _reject(self, reason, message):
+        self.active = False
+        with _stats_lock:
+            upload_stats[f"rejected_{reason}"] += 1
+        raise ValidationError({self.field_name: [message]})
@@ -1,20 +1,63 @@
+import hashlib
+
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import status
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from catalog.cache import catalog_version, get_similarity_graph, get_subtree_bytes, get_tree_bytes
+from catalog.category_import import import_categories, records_from_csv
+from catalog.export import iter_flat_categories, iter_root_subtrees, stream_json_array, stream_ndjson
+from catalog.graph_analysis import k_hop_neighbourhood, shortest_path
+from catalog.islands import island_members, island_of, load_islands
 from catalog.models import Category, SimilarCategory
+from catalog.ordering import apply_moves, move_category
+from catalog.pagination import CategoryKeysetPagination, DepthPagination, SimilarityCursorPagination
+from catalog.similarity_import import import_similarities, parse_pairs
 from catalog.serializers import (
+    CategoryMoveSerializer,
     CategorySerializer,
     CategoryTreeSerializer,
     SimilarCategorySerializer,
 )
+from catalog.tree import CategoryTree
+from catalog.uploads import CategoryImageUploadHandler
+
+
+def _catalog_etag(request, *args, **kwargs):
+    resource = f"{catalog_version()}:{request.get_full_path()}"
+    return hashlib.blake2b(resource.encode(), digest_size=16).hexdigest()
+
+
+# Strong ETag from the catalog revision and the requested path and query string, so every
+# resource and page has its own validator; unchanged catalogs get a 304 before any serializer work
+conditional_on_catalog = method_decorator(condition(etag_func=_catalog_etag))
+
+MAX_SIMILAR_HOPS = 4
+# Caps the k-hop response; a few hops out of a hub can reach most of the catalog
+MAX_SIMILAR_RESULTS = 1000
+
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson"}
+
+
+def _category_names(ids):
+    return dict(Category.objects.filter(pk__in=ids).values_list("id", "name"))
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all().prefetch_related("children")
+    queryset = Category.objects.all().prefetch_related("children", "similar_to")
     serializer_class = CategorySerializer
+    pagination_class = CategoryKeysetPagination
+
+    def initialize_request(self, request, *args, **kwargs):
+        # Must run before anything reads the body, so the image is vetted while it streams in
+        request.upload_handlers.insert(0, CategoryImageUploadHandler(request))
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action == "tree":
@@ -26,35 +69,129 @@ class CategoryViewSet(viewsets.ModelViewSet):
         parent_id = self.request.query_params.get("parent")
         if parent_id is not None:
             queryset = queryset.filter(parent_id=parent_id)
+        depth = self.request.query_params.get("depth")
+        if self.action == "list" and depth is not None and depth.isdigit():
+            queryset = queryset.filter(depth=int(depth))
         return queryset
 
+    @conditional_on_catalog
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_on_catalog
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"])
+    @conditional_on_catalog
     def tree(self, request):
-        roots = Category.objects.filter(parent__isnull=True)
-        serializer = CategoryTreeSerializer(roots, many=True)
-        return Response(serializer.data)
+        return HttpResponse(get_tree_bytes(), content_type="application/json")
 
     @action(detail=True, methods=["get"])
+    @conditional_on_catalog
     def subtree(self, request, pk=None):
-        category = self.get_object()
-        data = CategoryTreeSerializer(category).data
-        return Response(data)
+        """Nested subtree; ?max_depth= limits the levels below the root, ?fields=id,name the fields per node."""
+        max_depth = request.query_params.get("max_depth")
+        if max_depth is not None:
+            if not max_depth.isdigit():
+                return Response({"detail": "max_depth must be a non-negative integer"}, status=400)
+            max_depth = int(max_depth)
+
+        fields = request.query_params.get("fields")
+        if fields is not None:
+            fields = {field.strip() for field in fields.split(",") if field.strip()}
+            unknown = fields - CategoryTreeSerializer.FIELD_COLUMNS.keys() - {"children"}
+            if unknown:
+                return Response({"detail": f"Unknown fields: {', '.join(sorted(unknown))}"}, status=400)
+            fields.discard("children")
+
+        try:
+            data = get_subtree_bytes(int(pk), max_depth=max_depth, fields=fields)
+        except (ValueError, Category.DoesNotExist):
+            raise Http404
+        return HttpResponse(data, content_type="application/json")
+
+    @action(detail=False, methods=["get"])
+    @conditional_on_catalog
+    def export(self, request):
+        shape = request.query_params.get("shape", "tree")
+        output = request.query_params.get("output", "json")
+        if shape not in ("tree", "flat") or output not in ("json", "ndjson"):
+            return Response(
+                {"detail": "shape must be 'tree' or 'flat' and output must be 'json' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        items = iter_root_subtrees() if shape == "tree" else iter_flat_categories()
+        if output == "ndjson":
+            return StreamingHttpResponse(stream_ndjson(items), content_type="application/x-ndjson")
+        return StreamingHttpResponse(stream_json_array(items), content_type="application/json")
 
     @action(detail=False, methods=["get"])
+    @conditional_on_catalog
     def by_depth(self, request):
+        depth_range = request.query_params.get("depth_range")
         try:
-            target_depth = int(request.query_params.get("depth", -1))
+            if depth_range is not None:
+                min_depth, max_depth = (int(value) for value in depth_range.split("-", 1))
+            else:
+                min_depth = max_depth = int(request.query_params.get("depth", -1))
         except ValueError:
             return Response({"detail": "Invalid depth"}, status=400)
 
-        if target_depth < 0:
+        if min_depth < 0:
             return Response({"detail": "Depth must be non-negative"}, status=400)
+        if max_depth < min_depth:
+            return Response({"detail": "Depth range start must not exceed its end"}, status=400)
+
+        # Served by the (depth, parent, order) index on the stored depth column
+        queryset = (
+            self.get_queryset()
+            .filter(depth__range=(min_depth, max_depth))
+            .order_by("depth", "parent_id", "order", "id")
+        )
+        paginator = DepthPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
-        # Efficient filtering using Python in-memory property (for small category counts)
-        matching = [c for c in Category.objects.all() if c.depth == target_depth]
-        serializer = self.get_serializer(matching, many=True)
+        serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"])
+    @conditional_on_catalog
+    def island(self, request, pk=None):
+        category = self.get_object()
+        island_id = island_of(category.pk)
+        return Response({"island": island_id, "categories": sorted(island_members(island_id))})
+
+    @action(detail=True, methods=["get"])
+    @conditional_on_catalog
+    def similar(self, request, pk=None):
+        """Categories within ?hops= similarity links (default 1), nearest first."""
+        try:
+            hops = int(request.query_params.get("hops", 1))
+        except ValueError:
+            return Response({"detail": "hops must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= hops <= MAX_SIMILAR_HOPS:
+            return Response(
+                {"detail": f"hops must be between 1 and {MAX_SIMILAR_HOPS}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            category_id = int(pk)
+            if not Category.objects.filter(pk=category_id).exists():
+                raise Category.DoesNotExist
+        except (ValueError, Category.DoesNotExist):
+            raise Http404
+
+        found = k_hop_neighbourhood(get_similarity_graph(), category_id, hops, limit=MAX_SIMILAR_RESULTS)
+        names = _category_names([category_id for category_id, _ in found])
+        return Response([
+            {"id": category_id, "name": names.get(category_id), "distance": distance}
+            for category_id, distance in found
+        ])
+
     @action(detail=True, methods=["post"], url_path="move-up")
     def move_up(self, request, pk=None):
         return self._move(pk, request, direction="up")
@@ -70,27 +207,45 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 raise ValueError()
         except ValueError:
             return Response({"detail": "steps must be a positive integer"}, status=400)
-        category = self.get_object()
-        siblings = list(category.parent.children.order_by("order") if category.parent else Category.objects.filter(
-            parent=None).order_by("order"))
-        idx = siblings.index(category)
-
-        if direction == "up":
-            new_idx = max(0, idx - steps)
-        elif direction == "down":
-            new_idx = min(len(siblings) - 1, idx + steps)
-        else:
+        if direction not in ("up", "down"):
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        if new_idx != idx:
-            siblings.insert(new_idx, siblings.pop(idx))
-            for i, cat in enumerate(siblings):
-                if cat.order != i:
-                    cat.order = i
-                    cat.save(update_fields=["order"])
-
+        category = self.get_object()
+        move_category(category.pk, -steps if direction == "up" else steps)
         return Response(status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=["post"], url_path="bulk-move")
+    def bulk_move(self, request):
+        serializer = CategoryMoveSerializer(data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        try:
+            root_ids = apply_moves(serializer.validated_data)
+        except DjangoValidationError as exc:
+            return Response({"detail": exc.messages}, status=status.HTTP_400_BAD_REQUEST)
+
+        tree = CategoryTree.load_subtrees(root_ids)
+        roots = [tree.nodes[pk] for pk in sorted(root_ids)]
+        return Response(CategoryTreeSerializer(roots, many=True, context=tree.context).data)
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_tree(self, request):
+        """
+        Creates or updates categories from a JSON list (or text/csv rows) of records with
+        external_id, name, description, parent (external_id), order and image. The whole
+        file is validated before anything is written.
+        """
+        if request.content_type == "text/csv":
+            records = records_from_csv(request.stream or [])
+        else:
+            records = request.data.get("categories") if isinstance(request.data, dict) else request.data
+            if not isinstance(records, list):
+                return Response({"detail": "Expected a list of categories"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            report = import_categories(records)
+        except DjangoValidationError as exc:
+            return Response({"detail": exc.messages}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED if report["created"] else status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         if Category.objects.filter(parent=instance).exists():
@@ -109,6 +264,62 @@ class CategoryViewSet(viewsets.ModelViewSet):
 class SimilarCategoryViewSet(viewsets.ModelViewSet):
     queryset = SimilarCategory.objects.all()
     serializer_class = SimilarCategorySerializer
+    pagination_class = SimilarityCursorPagination
+
+    @conditional_on_catalog
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_on_catalog
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    @conditional_on_catalog
+    def islands(self, request):
+        """Islands with at least two categories, largest first; categories without links are left out."""
+        islands = sorted(load_islands(include_singletons=False).items(), key=lambda item: (-len(item[1]), item[0]))
+        return Response([
+            {"island": island_id, "size": len(members), "categories": sorted(members)}
+            for island_id, members in islands
+        ])
+
+    @action(detail=False, methods=["get"], url_path="path")
+    @conditional_on_catalog
+    def similarity_path(self, request):
+        """Shortest chain of similarity links between ?from= and ?to=."""
+        try:
+            source, target = int(request.query_params["from"]), int(request.query_params["to"])
+        except (KeyError, ValueError):
+            return Response({"detail": "from and to must be category ids"}, status=status.HTTP_400_BAD_REQUEST)
+
+        names = _category_names([source, target])
+        if len(names) < len({source, target}):
+            raise Http404
+        path = shortest_path(get_similarity_graph(), source, target)
+        if path is None:
+            return Response({"detail": "The categories are not connected."}, status=status.HTTP_404_NOT_FOUND)
+
+        names.update(_category_names(path[1:-1]))
+        return Response({
+            "length": len(path) - 1,
+            "path": [{"id": category_id, "name": names.get(category_id)} for category_id in path],
+        })
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_pairs(self, request):
+        """
+        Bulk-inserts links from a text/csv (`a,b` rows) or application/x-ndjson body,
+        read line by line from the request stream.
+        """
+        input_format = IMPORT_CONTENT_TYPES.get(request.content_type)
+        if input_format is None:
+            return Response(
+                {"detail": f"Content type must be one of: {', '.join(IMPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        lines = request.stream or []
+        return Response(import_similarities(parse_pairs(lines, input_format)))
 
     def create(self, request, *args, **kwargs):
         category_a = request.data.get("category_a")
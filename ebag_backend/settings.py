@@ -22,6 +22,18 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Category images live in their own storage so they can move to object storage on their own,
+# e.g. an S3-compatible server through django-storages:
+#   "category_images": {
+#       "BACKEND": "storages.backends.s3.S3Storage",
+#       "OPTIONS": {"bucket_name": "ebag-media", "endpoint_url": "http://localhost:9000", "querystring_auth": False},
+#   }
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "category_images": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+}
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -86,6 +98,36 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The rendered category tree is cached under a catalog version key, which also builds the
+# ETags. Every process (web workers and management commands such as import_categories or
+# process_pending_thumbnails) must see the same version, so the cache lives on disk rather
+# than in process memory; Redis or Memcached work as well.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "var" / "cache",
+    }
+}
+
+CATALOG_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Seconds after which a pending or running graph report counts as lost and may be requested again
+GRAPH_REPORT_TIMEOUT = 30 * 60
+
+# Served in place of a category image until its thumbnail has been generated
+CATEGORY_IMAGE_PENDING = "category_images/pending.png"
+CATEGORY_THUMBNAIL_WORKERS = 2
+
+# Responsive variants rendered for every category image; the default one is served as `image`
+CATEGORY_IMAGE_VARIANT_SIZES = [48, 100, 320, 640]
+CATEGORY_IMAGE_VARIANT_FORMATS = ["webp", "jpeg"]
+CATEGORY_IMAGE_DEFAULT_VARIANT = (100, "jpeg")
+# Uploads whose header reports more pixels are rejected; Pillow's decompression bomb limit follows it
+CATEGORY_IMAGE_MAX_PIXELS = 4096 * 4096
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,5 +170,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
-    ]
+    ],
+    "PAGE_SIZE": 100,
 }
@@ -211,18 +211,23 @@ def create_categories():
     return id_map
 
 def create_similarities(id_map):
+    lines = []
     for sim in similarities:
         a = id_map.get(sim['category_a'])
         b = id_map.get(sim['category_b'])
         if not a or not b:
             print(f"⚠️ Skipping similarity (missing IDs): {sim}")
             continue
-        payload = {'category_a': a, 'category_b': b}
-        resp = requests.post(f"{BASE_URL}/similarities/", json=payload)
-        if resp.ok:
-            print(f"🔗 Linked similarity: {a} <-> {b}")
-        else:
-            print(f"❌ Failed similarity {a} <-> {b}: {resp.status_code} {resp.text}")
+        lines.append(f"{a},{b}")
+    resp = requests.post(
+        f"{BASE_URL}/similarities/import/",
+        data="\n".join(lines).encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    if resp.ok:
+        print(f"🔗 Linked similarities: {resp.json()}")
+    else:
+        print(f"❌ Failed similarity import: {resp.status_code} {resp.text}")
 
 if __name__ == "__main__":
     id_map = create_categories()